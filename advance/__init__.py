@@ -0,0 +1,2 @@
+# Shared data processing code for the ADVANCE network analyses.
+# The notebook, its subtask scripts, and the figure scripts add the repository root to sys.path and import from here.
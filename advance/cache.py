@@ -0,0 +1,111 @@
+# PURPOSE: Load the input CSVs through a typed columnar cache.
+# On the first read, the parsed CSV is stored next to it (in a __advance_cache__ folder) as a Parquet file, or as a
+# pickle if pyarrow is not installed or the table cannot be stored as Parquet. Later reads load the cache instead of
+# parsing the CSV again. The cache records the source file's size, mtime, and SHA-1 hash: a size change invalidates it,
+# and an mtime change invalidates it unless the content hash is unchanged.
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow # noqa: F401 (Parquet engine)
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+CACHE_DIR = '__advance_cache__'
+
+
+# Get the SHA-1 hash of the given file's contents
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Get the base path (without extension) of the cache for the given CSV and read_csv arguments; different arguments
+# (ex. usecols or dtypes) are cached separately
+def cache_base(path, kwargs):
+    key = hashlib.sha1(repr(sorted(kwargs.items())).encode()).hexdigest()[:12]
+    folder, name = os.path.split(os.path.abspath(path))
+    return os.path.join(folder, CACHE_DIR, os.path.splitext(name)[0] + '.' + key)
+
+
+# Determine whether the given cache meta still describes the given CSV (see the header). If only the mtime changed
+# and the contents did not, the meta is updated so that the file is not hashed again.
+def _is_fresh(meta, path, meta_path):
+    stat = os.stat(path)
+    if meta.get('size') != stat.st_size:
+        return False
+    if meta.get('mtime') == stat.st_mtime_ns:
+        return True
+    if meta.get('sha1') != file_hash(path):
+        return False
+    meta['mtime'] = stat.st_mtime_ns
+    _write_json(meta, meta_path)
+    return True
+
+
+# Write the given dict to the given path, replacing the previous file at once
+def _write_json(meta, meta_path):
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+# Store the given df as the cache for the given CSV, as Parquet if possible and as a pickle otherwise
+# Return: the cache meta dict
+def _write_cache(df, path, base):
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    stat = os.stat(path)
+    meta = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'sha1': file_hash(path), 'format': 'pickle'}
+
+    if HAS_PARQUET:
+        try:
+            df.to_parquet(base + '.parquet.tmp', engine='pyarrow')
+            os.replace(base + '.parquet.tmp', base + '.parquet')
+            meta['format'] = 'parquet'
+        except (ValueError, TypeError, NotImplementedError) as e: # ex. a column mixing strings and numbers
+            print('Caching ' + path + ' as a pickle, since it cannot be stored as Parquet: ' + str(e))
+    if meta['format'] == 'pickle':
+        df.to_pickle(base + '.pkl.tmp')
+        os.replace(base + '.pkl.tmp', base + '.pkl')
+
+    _write_json(meta, base + '.json')
+    return meta
+
+
+# Parquet reads the empty cells of string columns back as None; restore the NaNs which read_csv produces, since the
+# scripts test for missing strings as floats (ex. str(x) != 'nan')
+def _restore_nans(df):
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+# Read the given CSV (with the given read_csv arguments) through the cache
+# Return: the parsed df
+def read_csv_cached(path, **kwargs):
+    base = cache_base(path, kwargs)
+    meta_path = base + '.json'
+
+    if os.path.exists(meta_path):
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if _is_fresh(meta, path, meta_path):
+                if meta['format'] == 'parquet':
+                    return _restore_nans(pd.read_parquet(base + '.parquet', engine='pyarrow'))
+                return pd.read_pickle(base + '.pkl')
+        except (OSError, ValueError, KeyError, EOFError): # a missing or unreadable cache is rebuilt
+            pass
+
+    df = pd.read_csv(path, **kwargs)
+    _write_cache(df, path, base)
+    return df
@@ -0,0 +1,83 @@
+# PURPOSE: Share the precedence of the job and award role categories between the notebook and the figure scripts.
+# A scale lists its categories from highest to lowest. Each category's integer rank (1 = highest) is precomputed, and
+# columns are encoded as ordered categoricals, so that "highest" is an integer min which can run over whole groups.
+# Category variants (ex. "director_r") are collapsed by prefix through a lookup over the column's unique values.
+
+import numpy as np
+import pandas as pd
+
+
+# Collapse the category variants in the given values by prefix (ex. {'director': 'director'} maps director_r to
+# director). Each unique value is collapsed once, and the result is read back through the factorized codes.
+# Return: a series of the collapsed values, aligned with the given values (NaN stays NaN)
+def collapse_values(values, collapse):
+    values = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    codes, uniques = pd.factorize(values)
+    collapsed = pd.Series(uniques, dtype=object).astype(str)
+    for prefix, target in collapse.items():
+        collapsed = collapsed.mask(collapsed.str.startswith(prefix), target)
+
+    lookup = np.append(collapsed.to_numpy(dtype=object), np.nan) # code -1 (NaN) reads the last entry
+    return pd.Series(lookup[codes], index=values.index, dtype=object)
+
+
+class CategoryScale:
+    # Input: the list of categories from highest to lowest, and (optionally) a dict of prefix -> category to collapse
+    # variants with before encoding
+    def __init__(self, order, collapse=None):
+        self.order = list(order)
+        self.collapse = dict(collapse or {})
+        self.ranks = {cat: rank for rank, cat in enumerate(self.order, start=1)}
+        self.dtype = pd.CategoricalDtype(self.order, ordered=True)
+
+    # Get the rank of the given category (for sorting lists of categories with list.sort(key=...))
+    def key(self, cat):
+        return self.ranks[cat]
+
+    # Collapse the category variants in the given values (see collapse_values)
+    def collapse_values(self, values):
+        return collapse_values(values, self.collapse)
+
+    # Encode the given values as an ordered categorical series (values outside the scale become NaN)
+    def encode(self, values):
+        collapsed = self.collapse_values(values)
+        return pd.Series(pd.Categorical(collapsed, dtype=self.dtype), index=collapsed.index)
+
+    # Get the integer rank of each of the given values, as a float array (NaN outside the scale)
+    def rank(self, values):
+        codes = self.encode(values).cat.codes.to_numpy()
+        return np.where(codes >= 0, codes + 1, np.nan)
+
+    # Get the highest category among the given values (None if none of them are in the scale)
+    def highest(self, values):
+        codes = self.encode(values).cat.codes.to_numpy()
+        codes = codes[codes >= 0]
+        return self.order[codes.min()] if len(codes) > 0 else None
+
+    # Get the highest category in each group of the given df, grouping by the given key column(s)
+    # Return: a series of the highest category (NaN if none are in the scale), indexed by the group keys
+    def highest_by(self, df, keys, col):
+        codes = self.encode(df[col]).cat.codes.replace(-1, np.nan)
+        best = codes.groupby([df[k] for k in np.atleast_1d(keys)]).min()
+        lookup = np.array(self.order + [np.nan], dtype=object) # a group with no categories reads the last entry
+        return pd.Series(lookup[best.fillna(len(self.order)).astype(int)], index=best.index)
+
+
+# Job categories in the master dataset, from highest to lowest
+JOBS = CategoryScale(['admin_leadership', 'director_managerial', 'chair_dept', 'director_research', 'director_chair',
+                      'director_diversity', 'faculty', 'staff_management', 'staff_research', 'adjunct', 'postdoc',
+                      'non-uni', 'deceased'])
+
+# Award role categories, from highest to lowest
+ROLES = CategoryScale(['grantee', 'day-to-day', 'researcher', 'internal evaluator', 'external advisor',
+                       'external evaluator', 'external consultant'])
+
+# Broad job categories for the published figures: admin > director > staff > chair > faculty > non-uni,
+# with the trailing director info dropped (ex. "director_r")
+BROAD_JOBS = CategoryScale(['admin', 'director', 'staff', 'chair', 'faculty', 'non-uni'],
+                           collapse={'director': 'director'})
+
+# Job categories for the institution-change figures: admin > chair/director > faculty, with the chair and director
+# categories merged
+MOBILITY_JOBS = CategoryScale(['admin', 'chair/director', 'faculty'],
+                              collapse={'director': 'chair/director', 'chair': 'chair/director'})
@@ -0,0 +1,136 @@
+# PURPOSE: Clean the input files with whole-column operations.
+# Space trimming works on each string column's unique values (or categories). The jobs cleaning stage drops the
+# student and no-category positions (and, for the figure scripts, collapses and filters the job categories), and fills
+# in missing start/end years with the non-lower-bounded and non-upper-bounded placeholders, reporting what it changed.
+
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from advance.categories import collapse_values
+from advance.profiling import profile
+
+MIN_YEAR = 0 # placeholder for missing start years
+MAX_YEAR = 3000 # placeholder for missing end years
+
+
+# Get the mask of the given year column which is missing a year (empty, negative, or non-numeric)
+def missing_years(years):
+    if is_numeric_dtype(years):
+        return years.isna() | (years < 0)
+    return ~years.astype(str).str.isnumeric()
+
+
+# Report one line per dropped row, in the format 'person X has a <kind> position in row i'
+def _row_lines(dropped, kind):
+    return ('person ' + dropped['person_id'].astype(str) + ' has a ' + kind + ' position in row '
+            + dropped.index.astype(str)).tolist()
+
+
+# Clean the given individual jobs df in one stage:
+# - Drop the rows in drop_categories (student positions should not exist in the dataset)
+# - Drop the rows which are missing a job category
+# - Optionally, collapse category variants by prefix (ex. {'director': 'director'} maps director_r to director) and
+#   keep only the categories in keep
+# - Optionally, fill missing start years with MIN_YEAR and missing end years with MAX_YEAR
+# Row numbers in the report follow the original loops: student rows are numbered in the given df, and no-category
+# rows after the students have been dropped.
+# Return: the cleaned jobs df (reindexed from 0), and a report dict of counts, person ids, and report lines
+@profile()
+def clean_jobs(jobs, drop_categories=('student',), collapse=None, keep=None, fill_years=True):
+    report = {}
+
+    dropped = jobs['job_category'].isin(drop_categories)
+    report['students'] = int(dropped.sum())
+    report['student_ids'] = jobs.loc[dropped, 'person_id'].tolist()
+    report['student_lines'] = _row_lines(jobs[dropped], 'student')
+    jobs = jobs[~dropped].reset_index(drop=True)
+
+    no_category = jobs['job_category'].isna()
+    report['nan'] = int(no_category.sum())
+    report['nan_ids'] = jobs.loc[no_category, 'person_id'].tolist()
+    report['nan_lines'] = _row_lines(jobs[no_category], 'no-category')
+    jobs = jobs[~no_category]
+
+    if collapse or keep is not None:
+        jobs = jobs.copy()
+        cats = collapse_values(jobs['job_category'], collapse or {})
+        jobs['job_category'] = cats
+        kept = cats.isin(list(keep)) if keep is not None else cats.notna()
+        report['other'] = int((~kept).sum())
+        jobs = jobs[kept]
+
+    jobs = jobs.reset_index(drop=True)
+
+    if fill_years:
+        no_start = missing_years(jobs['job_start_year'])
+        no_end = missing_years(jobs['job_end_year'])
+        report['start_years'] = int(no_start.sum())
+        report['end_years'] = int(no_end.sum())
+        jobs['job_start_year'] = pd.to_numeric(jobs['job_start_year'].mask(no_start, MIN_YEAR))
+        jobs['job_end_year'] = pd.to_numeric(jobs['job_end_year'].mask(no_end, MAX_YEAR))
+
+    return jobs, report
+
+
+# Trim leading, trailing, and double-consecutive spaces in the string cells of the given df (in place), excluding the
+# given list of columns. Each string column's unique values are trimmed once and the changed ones are mapped back; a
+# categorical column has its categories trimmed, and categories which become equal are merged.
+# Return: a dict of column -> number of cells that changed
+@profile()
+def trim_spaces(df, exclude=()):
+    changed = {}
+    for col in df.columns.drop(list(exclude)):
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            changed[col] = _trim_categories(df, col)
+            continue
+        if df[col].dtype != object and str(df[col].dtype) != 'string':
+            continue
+        values = df[col]
+        trimmed = {}
+        for value in values.dropna().unique():
+            if isinstance(value, str):
+                new = ' '.join(value.split())
+                if new != value:
+                    trimmed[value] = new
+
+        mask = values.isin(list(trimmed))
+        if mask.any():
+            df.loc[mask, col] = values[mask].map(trimmed)
+        changed[col] = int(mask.sum())
+    return changed
+
+
+# Trim the categories of the given categorical column of the given df (in place), merging the categories which become
+# equal; the cells keep their order and NaN cells stay NaN
+# Return: the number of cells that changed
+def _trim_categories(df, col):
+    values = df[col]
+    old = values.cat.categories
+    new = [' '.join(cat.split()) if isinstance(cat, str) else cat for cat in old]
+    renamed = [cat for cat, trimmed in zip(old, new) if trimmed != cat]
+    if len(renamed) == 0:
+        return 0
+
+    merged = pd.Index(new).unique()
+    codes = merged.get_indexer(new)[values.cat.codes.to_numpy()]
+    codes[values.cat.codes.to_numpy() == -1] = -1
+    df[col] = pd.Categorical.from_codes(codes, categories=merged, ordered=values.cat.ordered)
+    return int(values.isin(renamed).sum())
+
+
+# Read the given CSV and trim its string cells, excluding the given list of columns.
+# If a chunksize is given, the file is read and trimmed chunksize rows at a time, so that large extracts never need to
+# be held as untrimmed text in full.
+# Return: the trimmed df, and a dict of column -> number of cells that changed
+def read_trimmed_csv(path, exclude=(), chunksize=None, **kwargs):
+    if chunksize is None:
+        df = pd.read_csv(path, **kwargs)
+        return df, trim_spaces(df, exclude)
+
+    chunks = []
+    changed = {}
+    for chunk in pd.read_csv(path, chunksize=chunksize, **kwargs):
+        for col, count in trim_spaces(chunk, exclude).items():
+            changed[col] = changed.get(col, 0) + count
+        chunks.append(chunk)
+    return pd.concat(chunks, ignore_index=True), changed
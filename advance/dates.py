@@ -0,0 +1,73 @@
+# PURPOSE: Find date issues in the individual jobs and awards tables with whole-table comparisons.
+# Each person's first award (year and org) is computed once and joined onto the jobs, so that a check such as "an
+# ADVANCE director title which starts before the person entered the network" is a single vectorized comparison.
+
+import pandas as pd
+
+from advance.cleaning import MIN_YEAR, MAX_YEAR
+from advance.profiling import profile
+
+# The patterns a job title must all match (case-insensitively) to count as an ADVANCE director title:
+# the title ends with "advance" or contains "advance ", and contains "director"
+DIRECTOR_PATTERNS = (r'advance$|advance ', r'director')
+
+
+# Get the mask of the given job titles which match all of the given regex patterns (NaN titles never match)
+def match_titles(titles, patterns=DIRECTOR_PATTERNS):
+    lowered = titles.str.lower()
+    mask = titles.notna()
+    for pattern in patterns:
+        mask &= lowered.str.contains(pattern, regex=True, na=False)
+    return mask
+
+
+# Get the first award of each person: the earliest award start year, and the org of the first award which started
+# in that year (in awards-table order)
+# Return: a df of (person_id, first_award_year, first_award_org) rows
+def first_awards(awards):
+    first = (awards[awards['person_id'].notna()]
+             .sort_values(['person_id', 'award_start_year'], kind='mergesort')
+             .drop_duplicates('person_id'))
+    return first[['person_id', 'award_start_year', 'award_org_id']].rename(
+        columns={'award_start_year': 'first_award_year', 'award_org_id': 'first_award_org'})
+
+
+# Find the jobs with a matching title which start before the person's first award (jobs with a missing start year,
+# and people without awards, are skipped)
+# Return: a df of (row, person_id, job_title, job_start_year, first_award_year, first_award_org) rows in jobs order,
+# where row is the job's index label in the given df
+@profile()
+def early_title_jobs(jobs, awards, patterns=DIRECTOR_PATTERNS):
+    titled = jobs[match_titles(jobs['job_title'], patterns) & (jobs['job_start_year'] != MIN_YEAR).fillna(False)]
+    titled = titled[['person_id', 'job_title', 'job_start_year']].rename_axis('row').reset_index()
+    early = titled.merge(first_awards(awards), on='person_id')
+    early = early[(early['job_start_year'] < early['first_award_year']).fillna(False)]
+    return early.sort_values('row', kind='mergesort').reset_index(drop=True)
+
+
+# Find the jobs which end before they start (missing years are filled with placeholders and never count)
+# Return: the offending rows of the given jobs df
+def reversed_jobs(jobs):
+    start, end = jobs['job_start_year'], jobs['job_end_year']
+    return jobs[((start != MIN_YEAR) & (end != MAX_YEAR) & (end < start)).fillna(False)]
+
+
+# Find the awards which end before they start
+# Return: the offending rows of the given awards df (which must have an award_end_year column)
+def reversed_awards(awards):
+    return awards[(awards['award_end_year'] < awards['award_start_year']).fillna(False)]
+
+
+# Find the awards which start outside of the person's job span, i.e. before the start of their earliest job or after
+# the end of their latest job (missing years are filled with placeholders and never count)
+# Return: a df of the offending award rows, with the person's job_span_start and job_span_end
+def awards_outside_jobs(jobs, awards):
+    years = pd.DataFrame({'person_id': jobs['person_id'],
+                          'start': jobs['job_start_year'].where(jobs['job_start_year'] != MIN_YEAR),
+                          'end': jobs['job_end_year'].where(jobs['job_end_year'] != MAX_YEAR)})
+    spans = years.groupby('person_id').agg(job_span_start=('start', 'min'), job_span_end=('end', 'max')).reset_index()
+
+    joined = awards.merge(spans, on='person_id')
+    outside = ((joined['award_start_year'] < joined['job_span_start'])
+               | (joined['award_start_year'] > joined['job_span_end']))
+    return joined[outside.fillna(False)].reset_index(drop=True)
@@ -0,0 +1,222 @@
+# PURPOSE: Share the data loading, filtering, and counting of the small visualization figures.
+# A FigureData loads each master table once, and memoizes the award role filters and the person/role deduplication,
+# so that a run which renders many figures reads and filters the data once. The figures count their bars with one
+# crosstab rather than re-filtering the master df for every bar segment. The cohort bar charts (ex. figures 03, 24, 29)
+# are small CohortBar specs: a role group, a demographic dimension, a palette, and a title.
+
+import os
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from matplotlib.lines import Line2D
+
+from advance.schema import read_table
+
+PI_ROLES = ('pi', 'co-pi', 'former pi', 'former co-pi')
+
+# The award role groups of the figures: the PIs and co-PIs, and the other internal and external team members
+PI, INTERNAL, EXTERNAL = 'pi', 'internal', 'external'
+
+GRID_COLOR = '#d9d9d8' # light gray
+TEXT_COLOR = '#404040' # dark gray
+
+
+# Get the mask of the given award roles which are in the given role group (see above)
+def role_mask(roles, group):
+    is_pi = roles.isin(PI_ROLES)
+    if group == PI:
+        return is_pi
+    other = EXTERNAL if group == INTERNAL else INTERNAL
+    return ~is_pi & ~roles.astype(str).str.contains(other)
+
+
+# Get the sorted distinct values of the given column, without missing values
+def levels(values):
+    return sorted(values.dropna().unique())
+
+
+# Count the rows of the given df for each value (or combination of values) of the index column(s) and each value of
+# the counted column, in one crosstab
+# Input: the df, the index column or list of columns, the counted column, and (optionally) the counted values; the
+# rows default to every combination of the index columns' present values, and the columns to the present values
+# Return: a df of counts, with a row for each index value and a column for each counted value
+def counts(df, index, column, values=None):
+    index = [index] if isinstance(index, str) else list(index)
+    if len(index) > 1:
+        rows = pd.MultiIndex.from_product([levels(df[col]) for col in index], names=index)
+    else:
+        rows = pd.Index(levels(df[index[0]]), name=index[0])
+    cols = levels(df[column]) if values is None else list(values)
+
+    q = pd.crosstab([df[col].astype(object) for col in index], df[column].astype(object))
+    return q.reindex(index=rows, columns=cols, fill_value=0)
+
+
+# Get the given counts as whole percentages of each row's total (a row without counts is all 0)
+def percentages(q):
+    totals = q.sum(axis=1)
+    # Multiplied before dividing, as in the figure scripts (ex. 23*100/40 rounds to 58, but 23/40*100 to 57)
+    return (q * 100).div(totals.where(totals != 0), axis=0).round().fillna(0).astype(int)
+
+
+class FigureData:
+    # Input: the master data folder, and the level of the figures ('person' or 'role')
+    def __init__(self, inp, level='person'):
+        self.inp = inp
+        self.level = level
+        self.level_cols = ['person_id'] if level == 'person' else ['person_id', 'award_id']
+        self._tables = {}
+        self._cache = {}
+
+    # Get the given master table (ex. 'individual_awards'), loading it on first use
+    def table(self, name):
+        if name not in self._tables:
+            self._tables[name] = read_table(name, self.inp + name + '.csv')
+        return self._tables[name]
+
+    # Get the individual awards of the given role group, of the given award type (all types if None)
+    def roles(self, group, award_type=None):
+        key = ('roles', group, award_type)
+        if key not in self._cache:
+            awards = self.table('individual_awards')
+            mask = role_mask(awards['award_role'], group)
+            if award_type is not None:
+                mask &= awards['award_type'] == award_type
+            self._cache[key] = awards[mask.fillna(False)]
+        return self._cache[key]
+
+    # Get the individual awards of the given role group and award type, with the duplicates of the figures' level
+    # dropped (one row per person, or per person and award)
+    # Return: a df of (person_id, award_id, award_start_year, award_role) rows
+    def team(self, group, award_type=None):
+        key = ('team', group, award_type)
+        if key not in self._cache:
+            team = self.roles(group, award_type).drop_duplicates(self.level_cols)
+            self._cache[key] = team[['person_id', 'award_id', 'award_start_year', 'award_role']]
+        return self._cache[key]
+
+    # Get the team members of the given role group and award type in the given cohort range, with their demographics;
+    # members without a demographics row, or missing one of the required demographic columns, are dropped
+    # Return: a df of (person_id, award_id, cohort, <demographic and required columns>) rows
+    def cohort_team(self, group, award_type, cohorts, dems, required=()):
+        key = ('cohort_team', group, award_type, tuple(cohorts), tuple(dems), tuple(required))
+        if key not in self._cache:
+            awards = self.table('awards')[['award_id', 'cohort']]
+            cols = list(dict.fromkeys(list(dems) + list(required)))
+            people = self.table('individual_demographics')[['person_id'] + cols].dropna(subset=list(required))
+
+            team = self.team(group, award_type)[['person_id', 'award_id']].merge(awards, on='award_id', how='left')
+            team = team[team['cohort'].between(*cohorts).fillna(False)]
+            self._cache[key] = team.merge(people, on='person_id')
+        return self._cache[key]
+
+
+# The FigureData of each (master data folder, level) in this process (see shared_data)
+_shared = {}
+
+
+# Get this process's FigureData of the given master data folder and level, creating it on first use, so that the
+# figure scripts run in one process (ex. by a render.py worker) load and filter the tables once
+def shared_data(inp, level='person'):
+    key = (os.path.abspath(inp), level)
+    if key not in _shared:
+        _shared[key] = FigureData(key[0] + os.sep, level)
+    return _shared[key]
+
+
+# Draw the shared axis styling of the bar charts: horizontal grid lines, no top and side borders, and a legend of the
+# given colors and labels (bottom center)
+def style_bar_axes(ax, colors, labels, legend_y, legend_size=18):
+    plt.grid(color=GRID_COLOR, which='major', axis='y', linestyle='solid', linewidth=2)
+    ax.set_axisbelow(True)
+    ax.spines['bottom'].set_color(GRID_COLOR)
+    ax.spines['top'].set_color('none')
+    ax.spines['left'].set_color('none')
+    ax.spines['right'].set_color('none')
+
+    custom_lines = [Line2D([0], [0], color=c, marker="s", markersize=10, linewidth=0, label=lab)
+                    for c, lab in zip(colors, labels)]
+    leg = ax.legend(handles=custom_lines, loc='upper center', bbox_to_anchor=(0.5, legend_y), ncol=len(labels),
+                    framealpha=0, prop={'size': 16})
+    for text in leg.get_texts():
+        plt.setp(text, color=TEXT_COLOR, fontsize=legend_size)
+
+
+class CohortBar:
+    # A stacked percentage bar chart of a team's demographic dimension across the cohorts
+    # Input: the figure name (the output file prefix), the role group and award type, the demographic column, its
+    # values (bottom to top) with their legend labels and colors, and the title, formatted with the cohort range and
+    # level (ex. 'Gender across Cohorts {min}-{max}, {level}-Level'). Optionally: the demographic columns a member
+    # must have, the cohort range, the figure size per bar (width, height), the font sizes, the y-tick step, whether to
+    # hide the 0 counts, whether to round the top segment so that each bar adds up to 100%, and the layout padding.
+    def __init__(self, name, group, dimension, values, labels, colors, title, required=(), award_type='it',
+                 cohorts=(1, 9), bar_size=(1.6, 6), title_size=26, text_size=16, y_tick_size=18, y_step=20,
+                 hide_zeros=False, fill_to_100=False, pad=2):
+        self.name = name
+        self.group = group
+        self.dimension = dimension
+        self.values = list(values)
+        self.labels = list(labels)
+        self.colors = list(colors)
+        self.title = title
+        self.required = tuple(required)
+        self.award_type = award_type
+        self.cohorts = tuple(cohorts)
+        self.bar_size = bar_size
+        self.title_size = title_size
+        self.text_size = text_size
+        self.y_tick_size = y_tick_size
+        self.y_step = y_step
+        self.hide_zeros = hide_zeros
+        self.fill_to_100 = fill_to_100
+        self.pad = pad
+
+    # Count the team members of each cohort with each of the figure's values
+    # Return: a df of counts, with a row for each cohort and a column for each value
+    def counts(self, data):
+        team = data.cohort_team(self.group, self.award_type, self.cohorts, [self.dimension], self.required)
+        return counts(team, 'cohort', self.dimension, self.values)
+
+    # Get the bar percentages of the given counts
+    def percentages(self, q):
+        perc = percentages(q)
+        if self.fill_to_100:
+            top = perc.columns[-1]
+            perc[top] = perc[top].where(q.sum(axis=1) == 0, perc[top] + 100 - perc.sum(axis=1))
+        return perc
+
+    # Render the figure from the given figure data, and save it to the given folder
+    def render(self, data, outp):
+        q = self.counts(data)
+        perc = self.percentages(q)
+        cohorts = list(q.index)
+        num_x = len(cohorts)
+
+        fig = plt.figure(figsize=(num_x * self.bar_size[0], self.bar_size[1])) # size of bar chart figure
+        for i, cohort in enumerate(cohorts, start=1):
+            bottom = 0
+            for value, color in zip(self.values, self.colors):
+                raw, p = int(q.loc[cohort, value]), int(perc.loc[cohort, value])
+                plt.bar(i, p, bottom=bottom, color=color, width=0.35)
+                text = '' if self.hide_zeros and raw == 0 else raw
+                plt.text(i, bottom + p / 2, text, ha="center", va="center", fontsize=self.text_size)
+                bottom += p
+        ax = plt.gca()
+
+        # Title the graph with the total count
+        title = self.title.format(min=self.cohorts[0], max=self.cohorts[1], level=data.level.title())
+        plt.title(title + ' (n=' + str(int(q.values.sum())) + ')', fontsize=self.title_size, pad=15, color=TEXT_COLOR)
+
+        # Label the bars on x-axis with the cohort nums, and the y-axis with percentages
+        plt.xticks(np.arange(1, num_x + 1, 1), cohorts, fontsize=18, color=TEXT_COLOR)
+        y_vals = np.arange(0, 110, self.y_step)
+        plt.yticks(y_vals, [(str(y) + '%') for y in y_vals], fontsize=self.y_tick_size, color=TEXT_COLOR)
+
+        style_bar_axes(ax, self.colors, self.labels, -0.1)
+        if self.pad is None:
+            plt.tight_layout()
+        else:
+            plt.tight_layout(pad=self.pad)
+        plt.savefig(outp + self.name + '_' + data.level + '.png')
+        plt.close(fig)
@@ -0,0 +1,164 @@
+# PURPOSE: Refresh the person- and role-level logs of first, highest, and last jobs for only the people whose input
+# rows changed since the previous refresh.
+# Each refresh stores a snapshot of the row hashes of the input tables, the two logs, and their position counts (the
+# counts of the report's location section). The next refresh hashes the new input rows, diffs them against the
+# snapshot to find the affected people, locates the positions of only those people (and their award roles), and
+# patches the stored logs and counts. Hashing is one vectorized pass over each table, while the position location,
+# which dominates a full run, scales with the number of affected people. A snapshot written by different code or
+# configuration (see the version of IncrementalLogs) is discarded, and the logs are rebuilt in full.
+
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+# The key columns of each input table, which link its changed rows to the affected people: the person tables by
+# person_id, the organizations by org_id (through the jobs at them), and the awards by their start year and
+# institution (through the award roles whose end year is looked up by them)
+TABLE_KEYS = {'individual_jobs': ['person_id'],
+              'individual_awards': ['person_id'],
+              'individual_demographics': ['person_id'],
+              'organizations': ['org_id'],
+              'awards': ['award_start_year', 'awarded_org_id']}
+
+# The log columns which hold the located positions
+POSITIONS = ['first_job', 'highest_job', 'last_job']
+
+
+# Get the hash of each row of the given df, with the given key columns
+# Return: a df of the key columns and a hash column, one row per row of the given df
+def row_hashes(df, keys):
+    hashes = df[keys].reset_index(drop=True)
+    hashes['hash'] = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashes
+
+
+# Get the keys of the rows which are in only one of the given row hash dfs. Repeated rows are numbered, so that a
+# duplicated (or de-duplicated) row counts as a change too.
+# Return: a df of the distinct changed keys
+def changed_keys(old, new, keys):
+    def numbered(hashes):
+        return hashes.assign(copy=hashes.groupby(keys + ['hash'], dropna=False).cumcount())
+
+    diff = numbered(old).merge(numbered(new), on=keys + ['hash', 'copy'], how='outer', indicator=True)
+    return diff.loc[diff['_merge'] != 'both', keys].drop_duplicates()
+
+
+# Get the people affected by the changes between the given row hashes (table -> row hash df) of the previous and the
+# current input tables (table -> df)
+# Return: an array of the affected person ids
+def affected_people(old_hashes, new_hashes, tables):
+    people = [changed_keys(old_hashes[table], new_hashes[table], ['person_id'])['person_id']
+              for table in ('individual_jobs', 'individual_awards', 'individual_demographics')]
+
+    # The people with jobs at a changed organization
+    jobs = tables['individual_jobs']
+    orgs = changed_keys(old_hashes['organizations'], new_hashes['organizations'], ['org_id'])['org_id']
+    people.append(jobs.loc[jobs['employer_id'].isin(orgs), 'person_id'])
+
+    # The people with award roles whose award end year may have changed
+    roles = tables['individual_awards']
+    windows = changed_keys(old_hashes['awards'], new_hashes['awards'], TABLE_KEYS['awards'])
+    windows = pd.MultiIndex.from_frame(windows, names=['award_start_year', 'award_org_id'])
+    in_windows = pd.MultiIndex.from_frame(roles[['award_start_year', 'award_org_id']]).isin(windows)
+    people.append(roles.loc[in_windows, 'person_id'])
+
+    people = pd.concat(people, ignore_index=True)
+    return people[people.notna()].unique()
+
+
+# Get the rows of the given input tables (table -> df) which the positions of the given people depend on: their rows
+# of the person tables, the organizations they have jobs at, and the awards of their award roles
+def person_tables(tables, people):
+    subset = {table: tables[table][tables[table]['person_id'].isin(people)]
+              for table in ('individual_jobs', 'individual_awards', 'individual_demographics')}
+
+    orgs = tables['organizations']
+    subset['organizations'] = orgs[orgs['org_id'].isin(subset['individual_jobs']['employer_id'])]
+
+    awards = tables['awards']
+    windows = pd.MultiIndex.from_frame(subset['individual_awards'][['award_start_year', 'award_org_id']])
+    in_windows = pd.MultiIndex.from_frame(awards[TABLE_KEYS['awards']]).isin(windows)
+    subset['awards'] = awards[in_windows]
+    return subset
+
+
+# Count the located positions of the given log df: the number of rows in each job category (and missing) for each
+# position column, and the number of rows missing any position
+# Return: a df of counts, indexed by job category ('missing' for NaN), with one column per position column
+def position_counts(log):
+    counts = pd.DataFrame({col: log[col].astype(object).fillna('missing').value_counts() for col in POSITIONS})
+    counts.loc['missing any'] = int(log[POSITIONS].isna().any(axis=1).sum())
+    counts.loc['total'] = len(log)
+    return counts.fillna(0).astype(int)
+
+
+# Patch the given position counts, replacing the counts of the given old rows with the counts of the given new rows
+def patch_counts(counts, old_rows, new_rows):
+    patched = counts.sub(position_counts(old_rows), fill_value=0).add(position_counts(new_rows), fill_value=0)
+    return patched.astype(int)
+
+
+# Patch the given log df, replacing the rows of the given people with the given new rows. The rows are put back in the
+# order of their keys in the given source df (rows with equal keys keep their order).
+# Return: the patched log, and the replaced rows
+def patch_log(log, new_rows, people, source, keys):
+    replaced = log['person_id'].isin(people)
+    patched = pd.concat([log[~replaced], new_rows], ignore_index=True)
+
+    order = source[keys].drop_duplicates().reset_index(drop=True)
+    order['order'] = np.arange(len(order))
+    patched = patched.merge(order, on=keys, how='left', sort=False)
+    patched = patched.sort_values('order', kind='mergesort').drop(columns='order').reset_index(drop=True)
+    return patched, log[replaced]
+
+
+class IncrementalLogs:
+    # Input: the snapshot file path, the function which locates the positions of the given input tables (table -> df)
+    # and returns the person- and role-level logs, and the version of the code and configuration which the logs
+    # depend on (ex. a content hash of the tiers and the org keywords; a snapshot of another version is discarded)
+    def __init__(self, path, locate_positions, version=''):
+        self.path = path
+        self.locate_positions = locate_positions
+        self.version = version
+        self.people = None # the people whose positions the last refresh located (None: everyone)
+
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                snapshot = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return snapshot if snapshot.get('version') == self.version else None
+
+    def _save(self, snapshot):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.tmp', 'wb') as f:
+            pickle.dump(snapshot, f, protocol=4)
+        os.replace(self.path + '.tmp', self.path)
+
+    # Refresh the logs for the given input tables (table -> df, with the tables of TABLE_KEYS)
+    # Return: the person-level log, the role-level log, and a dict of their position counts ('person', 'role')
+    def refresh(self, tables):
+        hashes = {table: row_hashes(tables[table], keys) for table, keys in TABLE_KEYS.items()}
+        snapshot = self._load()
+
+        if snapshot is None:
+            self.people = None
+            person_log, role_log = self.locate_positions(tables)
+            counts = {'person': position_counts(person_log), 'role': position_counts(role_log)}
+        else:
+            self.people = affected_people(snapshot['hashes'], hashes, tables)
+            new_person_rows, new_role_rows = self.locate_positions(person_tables(tables, self.people))
+
+            person_log, old_person_rows = patch_log(snapshot['person_log'], new_person_rows, self.people,
+                                                    tables['individual_demographics'], ['person_id'])
+            role_log, old_role_rows = patch_log(snapshot['role_log'], new_role_rows, self.people,
+                                                tables['individual_awards'], ['person_id', 'award_id'])
+            counts = {'person': patch_counts(snapshot['counts']['person'], old_person_rows, new_person_rows),
+                      'role': patch_counts(snapshot['counts']['role'], old_role_rows, new_role_rows)}
+
+        self._save({'version': self.version, 'hashes': hashes, 'person_log': person_log, 'role_log': role_log,
+                    'counts': counts})
+        return person_log, role_log, counts
@@ -0,0 +1,224 @@
+# PURPOSE: Write the sections of the log task report from the computed tables, so that the notebook and the log task
+# pipeline (log_task.py) share one definition of the report text.
+# Each function writes one part of the report to the given ReportWriter (see report.py), with the same lines marked
+# for the console as in the notebook; the tables are only read.
+
+from datetime import datetime
+
+from pytz import timezone
+
+
+# Get the report header, with the current time
+def header():
+    now = datetime.now(timezone('EST'))
+    return 'ADVANCE Network Log Task Report\nGenerated ' + now.strftime("%m/%d/%Y %H:%M:%S EST") + ' by Mara Hubelbank'
+
+
+# Section 1: the sizes of the master tables, and the numbers of distinct values between them
+# Input: the organizations, awards, demographics, and individual awards dfs, the individual awards without duplicate
+# individuals within the same grant, the individual jobs, and the job and award role categories
+def out_rundown(report, orgs, awards, dems, roles, ind_awards, ind_jobs, job_cats, role_cats):
+    out = report.out
+    report.section(1, 'Dataset Rundown')
+    out('\nOur current dataset includes:')
+    out(str(len(orgs)) + ' organizations')
+    out(str(len(awards)) + ' awards')
+    out(str(len(dems)) + ' individuals')
+    out(str(len(roles)) + ' individual award roles (with some individuals having multiple roles per grant)')
+    out(str(len(ind_awards)) + ' individual award roles (after removal of duplicate individuals within the same grant)')
+    out(str(len(ind_jobs)) + ' individual jobs')
+
+    out('\nBetween these, there are:')
+    out(str(awards['awarded_org_id'].nunique(dropna=False)) + ' grant-receiving organizations')
+    out(str(roles['person_id'].nunique(dropna=False)) + ' individuals with at least one award role')
+    avg_roles = len(roles)/len(dems)
+    out(f'{avg_roles:.2g}' + ' award roles per individual, on average')
+    out(str(len(role_cats)) + ' award role categories')
+    out(str(roles['award_role'].nunique(dropna=False)) + ' unique award role titles (before processing)')
+    out(str(len(job_cats)) + ' job categories')
+    out(str(ind_jobs['job_title'].nunique(dropna=False)) + ' unique job titles (before processing)')
+
+
+# Section 1: the number of rows of the given df in each of the given categories (of the given column)
+# Input: the df, the category column, the sorted categories, the name of the rows (ex. 'individual jobs'), and the name
+# of each row (ex. 'positions')
+def out_category_counts(report, df, col, cats, name, noun):
+    report.out(' ', False)
+    report.out(report.line, False)
+    report.out('\nAmong the ' + name + ',')
+    for cat in cats:
+        count = int((df[col] == cat).sum())
+        perc = 100*count/len(df)
+        report.out(str(count) + ' are ' + cat + ' ' + noun + f' ({perc:.2g}%)')
+
+
+# Output the missing data counts of each column of the given df, from most to least missing (a cell is missing if it
+# is NaN or starts with "can't find" or "missing")
+def out_missing(report, df, name):
+    n = len(df)
+    report.out('\nFILE: ' + name + ' (n=' + str(n) + ')')
+    tups = []
+    for col in df:
+        text = df[col].astype(str)
+        na = df[col].isna().sum() + (text.str.startswith('can\'t find') | text.str.startswith('missing')).sum()
+        tups.append((col, na))
+
+    # Sort in descending order (most missing -> least missing)
+    for col, na in sorted(tups, key=lambda x: x[1], reverse=True):
+        perc = 100*na/n
+        report.out(col + ' column: ' + str(na) + f' rows missing ({perc:.2g}%)')
+
+
+# Section 2: the missing data of the individual jobs
+def out_missing_data(report, ind_jobs):
+    report.out('', False)
+    report.section(2, 'Missing Data')
+    out_missing(report, ind_jobs, 'Individual Jobs')
+
+
+# Section 3: the student and no-category positions which were dropped, and the missing years which were filled in,
+# from the report dict of the jobs cleaning stage (see cleaning.clean_jobs)
+def out_cleaning(report, cleaning):
+    out = report.out
+    report.section(3, 'Student and NaN Job Categories')
+    out('\n' + str(cleaning['students']) + ' students dropped for the jobs processing task.')
+    out(' ')
+    [out(line) for line in cleaning['student_lines']]
+    out('\nThe jobs/demographics and individual awards for the individuals with student positions are located in:')
+    out('> log_student_jobs.csv, log_student_awards.csv\n')
+    out(report.line)
+    out('\n' + str(cleaning['nan']) + ' no-category positions dropped for the jobs processing task.')
+    out(str(cleaning['start_years']) + ' start years were set to 0.')
+    out(str(cleaning['end_years']) + ' end years were set to 3000.')
+    out(' ')
+    [out(line) for line in cleaning['nan_lines']]
+    out('\nThe jobs/demographics and individual awards for the individuals with NaN-category positions are located in:')
+    out('> log_nan_jobs.csv, log_nan_awards.csv files.')
+
+
+# Section 4: the numbers of organizations labeled as universities (US and non-US) and as non-universities
+# Input: the organizations df, with the is_uni labels (see orgs.OrgClassifier)
+def out_universities(report, orgs):
+    out = report.out
+    out('', False)
+    report.section(4, 'Universities vs. Non-Universities')
+    us_unis = orgs['carnegie_id'].notna().sum() # Count of US universities
+    out('\nNOTE: The organizations file should be reviewed, since the ASME Board of Governors improperly has a Carnegie ID value,')
+    out('so there may be other errors in this data.\n')
+    unis = int(orgs['is_uni'].sum())
+    out(str(unis) + ' organizations are programmatically marked as universities. Of these, ' + str(us_unis)
+        + ' are US universities, and ' + str(unis-us_unis) + ' are non-US.')
+    out(str(int((~orgs['is_uni']).sum())) + ' organizations are programmatically marked as non-universities.')
+
+
+# Section 5: the ADVANCE director titles which start before the person entered the network
+# Input: the early title jobs df (see dates.early_title_jobs)
+def out_early_titles(report, early_jobs):
+    out = report.out
+    out('', False)
+    report.section(5, 'Individual Award Date Issues')
+    out('\nThese individuals have at least one job associated with being director of an ADVANCE program which starts before they')
+    out('entered the network.\n')
+    titles = early_jobs['job_title'].str.lower()
+    titles = titles.where(titles.str.len() <= 60, titles.str[:60] + '...')
+    job_lines = ('Person ' + early_jobs['person_id'].astype(str) + ' has a job as \"' + titles
+                 + '\" which starts in year ' + early_jobs['job_start_year'].astype('int64').astype(str) + '.')
+    award_lines = ('> Their first award started in ' + early_jobs['first_award_year'].astype('int64').astype(str)
+                   + ' at org ' + early_jobs['first_award_org'].astype('int64').astype(str) + '.')
+    for job_line, award_line in zip(job_lines, award_lines):
+        out(job_line)
+        out(award_line)
+
+
+# Section 6: the job titles which may not fit their category
+# Input: the misfits df (see terms.find_category_misfits), the sorted categories, and the number of most frequent
+# terms of each category which count as fitting it
+def out_misfits(report, misfits, cats, k):
+    out = report.out
+    out('', False)
+    report.section(6, 'Predicting Job Category Misplacement')
+    out('\nFor each category, we output the job titles which contain neither the ' + str(k) + ' most frequent terms '
+        + 'in their assigned category nor any of the manually defined category keys. This also points to some '
+        + 'misspelled job titles, such as \"profesor\".')
+    lines = 'Person ' + misfits['person_id'].astype('int64').astype(str) + ': ' + misfits['job_title']
+    for cat in cats:
+        out('\nJob titles which may not fit in category ' + cat + ': ')
+        [out(line) for line in lines[misfits['category'] == cat]]
+
+
+# Output a breakdown of the given log df (level = a string title for the data in the df): the job categories of the
+# located positions, and the jobs and award roles of the rows missing a position
+# Input: the report, the log df, the level, the cleaned jobs, the individual awards, and the sorted job and award role
+# categories
+def out_breakdown(report, df, level, jobs, awards, job_cats, role_cats):
+    out = report.out
+    missing = df[df['first_job'].isna() | df['highest_job'].isna() | df['last_job'].isna()]
+
+    n = len(df)
+    missing_any = len(missing)
+    missing_first = df['first_job'].isna().sum()
+    missing_highest = df['highest_job'].isna().sum()
+    missing_last = df['last_job'].isna().sum()
+
+    perc_filled = 100-(100*missing_any/n)
+    perc_first = 100*(missing_first)/n
+    perc_highest = 100*(missing_highest)/n
+    perc_last = 100*(missing_last)/n
+
+    # Analysis for individuals with found data -----------------------------------------------
+
+    out('\nFound first, highest, and last positions for ' + f'{perc_filled:.2g}%' + ' of the ' + str(n) + ' '
+        + level + ' in our records. (n=' + str(n - missing_any) + ')')
+
+    for col, name in (('first_job', 'first'), ('highest_job', 'highest'), ('last_job', 'last')):
+        out('\nThe ' + name + ' jobs of these ' + level + ' are:')
+        counts = df[col].value_counts()
+        for cat in job_cats:
+            count = int(counts.get(cat, 0))
+            perc = 100*count/(n-missing_any)
+            out(f'{perc:.1f}% ' + cat + ' positions (n=' + str(count) + ')')
+
+    # Analysis for individuals missing data -----------------------------------------------
+
+    out(' ')
+    out(report.line)
+    out(' ')
+    if (missing_first == missing_highest == missing_last):
+        out(str(missing_any) + ' ' + level + ' are missing first, highest, and last positions.')
+    else:
+        out(str(missing_first) + ' ' + level + ' are missing first positions out of ' +
+            str(n) + ' ' + level + '. ' + f'({perc_first:.2g}% filled)')
+        out(str(missing_highest) + ' ' + level + ' are missing highest positions out of ' +
+            str(n) + ' ' + level + '. ' + f'({perc_highest:.2g}% filled)')
+        out(str(missing_last) + ' ' + level + ' are missing last positions out of ' +
+            str(n) + ' ' + level + '. ' + f'({perc_last:.2g}% filled)')
+
+    out('\nOf the ' + str(missing_any) + ' ' + level + ' missing at least one of these positions,')
+
+    # Of those, see how many have no jobs which are not categorized as student/NaN
+    no_jobs = int((~missing['person_id'].isin(jobs['person_id'])).sum())
+    no_jobs_perc = 100*no_jobs/missing_any
+    out(f'{no_jobs_perc:.3g}%' + ' have zero jobs which are not categorized as student/NaN. (n=' + str(no_jobs) + ')')
+
+    # Get all the awards for those individuals, and output the distribution of award roles
+    awards_missing_ind = awards[awards['person_id'].isin(missing['person_id'])]
+    for cat in role_cats:
+        cat_count = awards_missing_ind.loc[awards_missing_ind['award_role_cat'] == cat, 'person_id'].nunique()
+        cat_perc = 100*cat_count/missing_any
+        out(f'{cat_perc:.2g}%' + ' have at least one ' + cat + ' award role. (n=' + str(cat_count) + ')')
+
+
+# Section 7: the breakdown of the person-level log (see out_breakdown)
+def out_person_positions(report, log, jobs, awards, job_cats, role_cats):
+    report.out('', False)
+    report.section(7, 'Location of First, Highest, and Last Jobs')
+    out_breakdown(report, log, 'individuals', jobs, awards, job_cats, role_cats)
+    report.out('\nThe jobs/demographics and individual awards for the individuals missing positions are located in:')
+    report.out('> log_missing_jobs.csv, log_missing_awards.csv')
+
+
+# Section 7: the breakdown of the role-level log (see out_breakdown)
+def out_role_positions(report, log, jobs, awards, job_cats, role_cats):
+    report.out(' ', False)
+    report.out(report.line, False)
+    out_breakdown(report, log, 'individual award roles', jobs, awards, job_cats, role_cats)
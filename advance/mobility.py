@@ -0,0 +1,44 @@
+# PURPOSE: Find the institution changes of award holders after their awards, for the mobility figures (ex. 16 and 17).
+# The award years are joined to the jobs once, for each distinct (person, award year) pair, rather than filtering the
+# whole jobs table for every award holder. The joined jobs which start in or after the award year are deduplicated by
+# employer (a return to a previous employer is not a change), and one grouped pass counts each pair's distinct
+# employers and finds the highest-ranked category among its earliest jobs.
+
+import numpy as np
+import pandas as pd
+
+from advance.categories import MOBILITY_JOBS
+from advance.profiling import profile
+
+
+# Find the institution changes after each of the given awards
+# Input: the jobs df (person_id, job_start_year, employer_id, job_category), the awards df (person_id and
+# award_start_year, one row per person or per person and award), and the scale which ranks the job categories
+# Return: a df aligned with the awards df with the number of distinct employers of the jobs which start in or after the
+# award year ('employers'), whether there is more than one ('changed_inst'), and the highest category among the
+# earliest of those jobs, one per employer ('job', NaN if there are no such jobs)
+@profile()
+def institution_changes(jobs, awards, scale=MOBILITY_JOBS):
+    keys = ['person_id', 'award_start_year']
+    pairs = awards.loc[awards['person_id'].notna(), keys].drop_duplicates().reset_index(drop=True)
+    pairs['pair'] = np.arange(len(pairs))
+
+    # The jobs keep their order among jobs of the same start year (the first of them is kept for each employer)
+    jobs = jobs[['person_id', 'job_start_year', 'employer_id', 'job_category']].assign(order=np.arange(len(jobs)))
+    joined = pairs.merge(jobs, on='person_id')
+    joined = joined[(joined['job_start_year'] >= joined['award_start_year']).fillna(False).to_numpy(dtype=bool)]
+    joined = joined.sort_values(['pair', 'job_start_year', 'order'], kind='mergesort')
+    joined = joined.drop_duplicates(['pair', 'employer_id'])
+
+    earliest = joined.groupby('pair', sort=False)['job_start_year'].transform('first')
+    is_earliest = (joined['job_start_year'] == earliest).to_numpy(dtype=bool)
+    joined['rank'] = np.where(is_earliest, scale.rank(joined['job_category']), np.nan)
+    stats = joined.groupby('pair', sort=False).agg(employers=('employer_id', 'size'), rank=('rank', 'min'))
+
+    found = awards[keys].merge(pairs.join(stats, on='pair'), on=keys, how='left')
+    lookup = np.array(scale.order + [np.nan], dtype=object) # an award without jobs reads the last entry
+    changes = pd.DataFrame({'employers': found['employers'].fillna(0).astype(int).to_numpy(),
+                            'job': lookup[found['rank'].fillna(len(scale.order) + 1).astype(int) - 1]},
+                           index=awards.index)
+    changes['changed_inst'] = changes['employers'] > 1
+    return changes
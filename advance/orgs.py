@@ -0,0 +1,120 @@
+# PURPOSE: Label organizations as universities or non-universities in bulk.
+# An organization is a university if:
+# - It has a Carnegie ID (US universities), or
+# - Its name contains a university keyword (ex. "university", "ecole") and no antikey (ex. "schools", which is only
+#   used by associations of schools), or
+# - Its name contains one of the manually reviewed exception pairs (ex. "institute" and "india").
+# The keywords, antikeys, and exceptions are read from the config/org_keywords.csv table.
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from advance.profiling import profile
+
+KEYWORDS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'org_keywords.csv')
+
+
+# Read the university keyword table: one row per (kind, term, qualifier), where kind is key, antikey, or exception;
+# an exception matches when the org name contains both its term and its qualifier
+def read_org_keywords(path=KEYWORDS_CSV):
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+# Compile a matcher for any of the given terms (None if there are none)
+def _any_term(terms):
+    if len(terms) == 0:
+        return None
+    return re.compile('|'.join(re.escape(t) for t in terms))
+
+
+# Return a boolean array, true where the given name contains a match of the given matcher
+def _contains(names, matcher):
+    if matcher is None:
+        return np.zeros(len(names), dtype=bool)
+    return names.str.contains(matcher).to_numpy(dtype=bool)
+
+
+class OrgClassifier:
+    def __init__(self, keywords=None):
+        if keywords is None:
+            keywords = read_org_keywords()
+
+        self.keys = keywords.loc[keywords['kind'] == 'key', 'term'].tolist()
+        self.antikeys = keywords.loc[keywords['kind'] == 'antikey', 'term'].tolist()
+        exceptions = keywords[keywords['kind'] == 'exception']
+        self.exceptions = list(zip(exceptions['term'], exceptions['qualifier']))
+
+        # One matcher for the keys and one for the antikeys, so a key is found even where it is the start of a longer
+        # antikey (ex. "school" in "schools"); each matcher only reports whether a name contains any of its terms
+        self.key_matcher = _any_term(self.keys)
+        self.antikey_matcher = _any_term(self.antikeys)
+
+        # Memoized labels, org_id -> is_uni; orgs that were already classified are not classified again
+        self.labels = {}
+
+    # Apply the name keyword rules to the given org names
+    # Return: a boolean array, true where the name marks the org as a university
+    def _match_names(self, names):
+        names = names.fillna('').astype(str).str.lower()
+        antikey = _contains(names, self.antikey_matcher)
+        key = _contains(names, self.key_matcher)
+        exception = np.zeros(len(names), dtype=bool)
+        for term, qualifier in self.exceptions:
+            exception |= (names.str.contains(term, regex=False) & names.str.contains(qualifier, regex=False)).to_numpy()
+        return ~antikey & (key | exception)
+
+    # Label each row of the given organizations df as a university (True) or non-university (False).
+    # Only org ids which have not been seen before are classified; the first row of each new org id is used.
+    # Return: a boolean series aligned with the given df (rows with a NaN org id are non-universities)
+    @profile()
+    def classify(self, orgs):
+        ids = orgs['org_id']
+        new = orgs[ids.notna() & ~ids.isin(list(self.labels))].drop_duplicates('org_id')
+        if len(new) > 0:
+            labels = new['carnegie_id'].notna().to_numpy() | self._match_names(new['org_name'])
+            self.labels.update(zip(new['org_id'].tolist(), labels.tolist()))
+        return ids.map(self.labels).fillna(False).astype(bool)
+
+    # Return whether the given (previously classified) org id is a university; a NaN or unclassified org id is not,
+    # and is reported through the given output function
+    @profile()
+    def is_uni(self, org_id, out=print):
+        if pd.isna(org_id):
+            out('NaN employer')
+            return False
+        if org_id not in self.labels:
+            out(str(org_id) + ' is not in the organizations CSV')
+            return False
+        return self.labels[org_id]
+
+
+# Relabel, in place, the positions at non-university employers that are not already marked as non-uni.
+# The jobs are joined to the org labels once, and all offending rows are relabeled with a single assignment.
+# Return: the report body (each non-university in organizations-file order, followed by its employees' previous
+# categories), and the list of index labels of the relabeled job rows
+@profile()
+def mark_non_uni_jobs(jobs, orgs):
+    non_unis = orgs.loc[orgs['is_uni'] == False, ['org_id', 'org_name']].drop_duplicates('org_id')
+    non_unis['org_order'] = np.arange(len(non_unis))
+
+    offending = jobs.loc[jobs['job_category'] != 'non-uni', ['person_id', 'employer_id', 'job_category']]
+    offending = offending.rename_axis('row').reset_index().merge(non_unis, left_on='employer_id', right_on='org_id')
+    offending = offending.sort_values(['org_order', 'row'], kind='mergesort')
+
+    changed = offending['row'].tolist()
+    if hasattr(jobs['job_category'], 'cat') and 'non-uni' not in jobs['job_category'].cat.categories:
+        jobs['job_category'] = jobs['job_category'].cat.add_categories('non-uni')
+    jobs.loc[changed, 'job_category'] = 'non-uni'
+
+    if len(offending) == 0:
+        return '', changed
+    offending['header'] = ('\n' + offending['org_id'].astype('int64').astype(str)
+                           + ': ' + offending['org_name'].astype(str))
+    offending['line'] = ('\n - ' + offending['person_id'].astype('int64').astype(str)
+                         + ' had uni position: ' + offending['job_category'].astype(str))
+    orgs_body = offending.groupby('org_order', sort=True).agg(header=('header', 'first'), lines=('line', ''.join))
+    body_uni = ''.join(orgs_body['header'] + orgs_body['lines'])
+    return body_uni, changed
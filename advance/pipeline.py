@@ -0,0 +1,183 @@
+# PURPOSE: Run a dependency graph of named stages, caching the output of each stage on disk.
+# A stage's cache key is a hash of its code, its parameters, and the content hashes of its inputs (the outputs of the
+# stages it depends on), so that a rerun executes only the stages whose code, parameters, or inputs changed. Since the
+# inputs are hashed by content, a stage which reruns but produces the same output (ex. a trim which changed nothing)
+# leaves the stages after it cached. File parameters (see File) are hashed by their contents, so that editing an input
+# CSV reruns the stages which read it.
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+
+import pandas as pd
+
+from advance.cache import file_hash
+from advance.profiling import block
+
+
+class File:
+    # A stage parameter naming a file, which is hashed by its contents rather than by its path
+    def __init__(self, path):
+        self.path = path
+
+    def __repr__(self):
+        return 'File(' + repr(self.path) + ')'
+
+
+# Feed the given value into the given hash, by content (dfs by their columns, dtypes, index, and values)
+def _update(digest, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(type(value).__name__.encode())
+        if isinstance(value, pd.DataFrame):
+            digest.update(repr([(str(col), str(t)) for col, t in value.dtypes.items()]).encode())
+        else:
+            digest.update(repr((value.name, str(value.dtype))).encode())
+        try:
+            digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        except TypeError: # unhashable cells (ex. lists)
+            digest.update(pickle.dumps(value, protocol=4))
+    elif isinstance(value, dict):
+        digest.update(b'dict')
+        for key in sorted(value, key=repr):
+            _update(digest, key)
+            _update(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(type(value).__name__.encode() + str(len(value)).encode())
+        for item in value:
+            _update(digest, item)
+    elif isinstance(value, File):
+        digest.update(b'file' + file_hash(value.path).encode())
+    elif inspect.ismodule(value) or callable(value):
+        try:
+            digest.update(inspect.getsource(value).encode())
+        except (OSError, TypeError): # ex. builtins, which have no source
+            digest.update(repr(value).encode())
+    else:
+        digest.update(pickle.dumps(value, protocol=4))
+
+
+# Get the SHA-1 hash of the given value's contents (see _update)
+def content_hash(value):
+    digest = hashlib.sha1()
+    _update(digest, value)
+    return digest.hexdigest()
+
+
+class Stage:
+    # Input: the stage name, the function computing its output, the names of the stages whose outputs it takes (passed
+    # to the function as keyword arguments of the same names), its parameters (passed as keyword arguments too), and
+    # the modules or functions (besides the stage function) whose code changes should rerun the stage
+    def __init__(self, name, func, inputs=(), params=None, code=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.params = dict(params or {})
+        self.code = list(code)
+
+    # Get the cache key of this stage, given the content hashes of its inputs
+    def key(self, input_hashes):
+        return content_hash([self.name, [self.func] + self.code, self.params, input_hashes])
+
+
+class Pipeline:
+    # Input: the folder to cache the stage outputs in, and the function to log the stage runs with (None for silence)
+    def __init__(self, cache_dir, log=print):
+        self.cache_dir = cache_dir
+        self.log = log or (lambda text: None)
+        self.stages = {}
+        self.executed = []
+        self.cached = []
+        self._values = {}
+
+    # Add a stage to the graph (see Stage); its inputs may be added later, but must exist when the graph is run
+    def add(self, name, func, inputs=(), params=None, code=()):
+        if name in self.stages:
+            raise ValueError('Duplicate stage: ' + name)
+        self.stages[name] = Stage(name, func, inputs, params, code)
+        return self.stages[name]
+
+    # Decorator form of add (ex. @pipeline.stage('trim', inputs=['load']))
+    def stage(self, name, inputs=(), params=None, code=()):
+        def register(func):
+            self.add(name, func, inputs, params, code)
+            return func
+        return register
+
+    # Get the names of the given stages and all of the stages they depend on, with each stage after its inputs
+    def order(self, targets):
+        ordered, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name not in self.stages:
+                raise KeyError('Unknown stage: ' + name)
+            if name in visiting:
+                raise ValueError('Cycle in the stage graph at: ' + name)
+            visiting.add(name)
+            for dep in self.stages[name].inputs:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            ordered.append(name)
+
+        for target in targets:
+            visit(target)
+        return ordered
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _read_meta(self, name):
+        try:
+            with open(self._path(name) + '.json') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    # Store the given output of the given stage, with its key and content hash
+    def _write(self, name, key, output, output_hash):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._path(name) + '.pkl.tmp', 'wb') as f:
+            pickle.dump(output, f, protocol=4)
+        os.replace(self._path(name) + '.pkl.tmp', self._path(name) + '.pkl')
+        with open(self._path(name) + '.json.tmp', 'w') as f:
+            json.dump({'key': key, 'hash': output_hash}, f)
+        os.replace(self._path(name) + '.json.tmp', self._path(name) + '.json')
+
+    # Get the output of the given stage, loading it from the cache if it was not computed in this run
+    def value(self, name):
+        if name not in self._values:
+            with open(self._path(name) + '.pkl', 'rb') as f:
+                self._values[name] = pickle.load(f)
+        return self._values[name]
+
+    # Run the given stages (all of them by default), executing only the stages whose cache key changed
+    # Return: a dict of stage name -> output, for the given stages
+    def run(self, targets=None):
+        targets = list(self.stages) if targets is None else list(targets)
+        self.executed, self.cached = [], []
+        hashes = {}
+
+        for name in self.order(targets):
+            stage = self.stages[name]
+            key = stage.key([hashes[dep] for dep in stage.inputs])
+            meta = self._read_meta(name)
+            if meta.get('key') == key and os.path.exists(self._path(name) + '.pkl'):
+                hashes[name] = meta['hash']
+                self.cached.append(name)
+                continue
+
+            self.log('Running stage ' + name)
+            kwargs = {dep: self.value(dep) for dep in stage.inputs}
+            kwargs.update(stage.params)
+            with block('stage ' + name): # measured when profiling is enabled (see profiling.py)
+                output = stage.func(**kwargs)
+            hashes[name] = content_hash(output)
+            self._values[name] = output
+            self._write(name, key, output, hashes[name])
+            self.executed.append(name)
+
+        return {name: self.value(name) for name in targets}
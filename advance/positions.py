@@ -0,0 +1,82 @@
+# PURPOSE: Locate the first, highest, and last positions of every person (or award role) at once.
+# The jobs are joined once to a table of keys (one row per person, or per person and award), and each fallback of the
+# original per-person lookups is a tier: a mask over the joined candidate rows, and which start year to pick from them.
+# A tier only resolves the keys left unresolved by the tiers before it, and the winner of each key is the highest job
+# (lowest rank in the job precedence dictionary) among its candidates in the picked start year.
+
+import numpy as np
+import pandas as pd
+
+from advance.profiling import profile
+
+# How a tier picks among its candidate rows: the first start year, the last start year, the last start year and then
+# the last end year among its jobs, or any row
+FIRST, LAST, LATEST, ANY = 'first', 'last', 'latest', 'any'
+
+
+# Get the first award of each person from the given awards df: the earliest award start year, and the institution of
+# that year's awards. If a person started at more than one institution in that year, the institution that appears
+# last (among the distinct institutions, in start year order) is used, as in the original per-person lookup.
+# Return: a df of (person_id, first_year, first_org, first_orgs) rows, where first_orgs counts the distinct
+# institutions in the first year (more than one is a tie)
+@profile()
+def first_award_orgs(awards):
+    awards = awards[awards['person_id'].notna()].sort_values(['person_id', 'award_start_year'], kind='mergesort')
+    first_year = awards.groupby('person_id', sort=False)['award_start_year'].transform('min')
+    first = awards[(awards['award_start_year'] == first_year).fillna(False)]
+    first = first.drop_duplicates(['person_id', 'award_org_id'])
+
+    last = first.drop_duplicates('person_id', keep='last').set_index('person_id')
+    return pd.DataFrame({'first_year': last['award_start_year'], 'first_org': last['award_org_id'],
+                         'first_orgs': first.groupby('person_id', sort=False).size()}).reset_index()
+
+
+# Get the mask of the given jobs df which are at one of the person's award institutions (a semi-join of the jobs'
+# (person_id, employer_id) pairs against the awards' (person_id, award_org_id) pairs)
+def at_award_orgs(jobs, awards):
+    pairs = awards[['person_id', 'award_org_id']].drop_duplicates()
+    pairs = pd.MultiIndex.from_frame(pairs, names=['person_id', 'employer_id'])
+    return pd.MultiIndex.from_frame(jobs[['person_id', 'employer_id']]).isin(pairs)
+
+
+# Pick the winning row of each key among the given candidate rows (see the tier picks above)
+def _pick(cands, pick):
+    if pick != ANY:
+        start = cands.groupby('key', sort=False)['job_start_year'].transform('min' if pick == FIRST else 'max')
+        cands = cands[(cands['job_start_year'] == start).fillna(False)]
+    if pick == LATEST:
+        end = cands.groupby('key', sort=False)['job_end_year'].transform('max')
+        cands = cands[(cands['job_end_year'] == end).fillna(False)]
+    return cands.sort_values(['key', 'rank'], kind='mergesort').drop_duplicates('key')
+
+
+# Locate a job for every row of the given keys df, which must have a person_id column, and any other columns that the
+# tier conditions read (ex. the year the person entered the network). The keys are joined to the person's jobs once.
+# Input: jobs df, keys df, list of (condition, pick) tiers, and job category -> precedence rank dictionary (1 = highest).
+# A condition is a function of the candidate rows (the job columns plus the key columns) which returns a boolean mask,
+# or None to take every job of the person.
+# Return: a df aligned with the keys df with the winning job_category, its job_start_year (NaN for ANY tiers), and the
+# number of the tier which resolved it (NaN if none did)
+@profile()
+def locate(jobs, keys, tiers, ranks):
+    keyed = keys.assign(key=np.arange(len(keys)))
+    cands = jobs.drop(columns=[c for c in keyed.columns if c != 'person_id' and c in jobs.columns])
+    cands = cands.merge(keyed, on='person_id')
+    cands['rank'] = cands['job_category'].map(ranks).astype('float64')
+
+    found = []
+    for tier, (condition, pick) in enumerate(tiers):
+        tier_cands = cands if condition is None else cands[condition(cands).fillna(False).to_numpy(dtype=bool)]
+        if len(tier_cands) == 0:
+            continue
+        picked = _pick(tier_cands, pick)[['key', 'job_category', 'job_start_year']]
+        if pick == ANY:
+            picked['job_start_year'] = np.nan
+        found.append(picked.assign(tier=tier))
+        cands = cands[~cands['key'].isin(picked['key'])]
+
+    cols = ['job_category', 'job_start_year', 'tier']
+    result = pd.concat(found) if found else pd.DataFrame(columns=['key'] + cols)
+    result = result.set_index('key')[cols].reindex(np.arange(len(keys)))
+    result.index = keys.index
+    return result
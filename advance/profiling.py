@@ -0,0 +1,128 @@
+# PURPOSE: Measure where the log task spends its time and memory, on request.
+# The hot helpers are decorated with @profile, and the pipeline stages run inside profiled blocks (see pipeline.py).
+# Each profiled name records its call count, its cumulative and mean wall time, and (if memory tracing is on) the peak
+# traced memory of its calls, through tracemalloc. Nested blocks are measured too: a helper called inside a stage
+# counts towards both. Profiling is off until enable() is called, and a disabled profile costs one attribute check per
+# call. The results are written as a "Performance" report section, and as JSON so that two runs can be compared.
+
+import functools
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class Stat:
+    # The measurements of one profiled name
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.peak = 0 # bytes
+
+    def as_dict(self):
+        return {'name': self.name, 'calls': self.calls, 'total_seconds': self.seconds,
+                'mean_seconds': self.seconds / self.calls if self.calls else 0.0, 'peak_mb': self.peak / 2**20}
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.stats = {}
+        self._stack = [] # the [start memory, peak memory] of each open block, innermost last
+        self._started_tracing = False
+
+    # Start recording (with memory tracing, unless memory=False); the previous measurements are kept
+    def enable(self, memory=True):
+        self.enabled = True
+        self.memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    # Stop recording (and stop memory tracing, if enable started it)
+    def disable(self):
+        self.enabled = False
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    # Discard the measurements
+    def reset(self):
+        self.stats = {}
+
+    # Measure the block under the given name (ex. with profiler.block('stage clean'): ...)
+    @contextmanager
+    def block(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack: # the peak so far belongs to the enclosing block, before it is reset for this one
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._stack.append([current, current])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            stat = self.stats.setdefault(name, Stat(name))
+            stat.calls += 1
+            stat.seconds += seconds
+            if self.memory and self._stack:
+                base, peak = self._stack.pop()
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                stat.peak = max(stat.peak, peak - base)
+                if self._stack:
+                    self._stack[-1][1] = max(self._stack[-1][1], peak)
+
+    # Decorator measuring each call of the function, under the given name (by default, module.function)
+    def profile(self, name=None):
+        def decorate(func):
+            label = name or func.__module__.split('.')[-1] + '.' + func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.block(label):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    # Get the measurements as a list of dicts, by descending total time
+    def results(self):
+        return [stat.as_dict() for stat in sorted(self.stats.values(), key=lambda stat: stat.seconds, reverse=True)]
+
+    # Write the measurements to the given JSON path
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({'generated': datetime.now().isoformat(timespec='seconds'), 'memory': self.memory,
+                       'entries': self.results()}, f, indent=1)
+
+    # Write the measurements as a report section, with the given section number (see report.py)
+    def write_section(self, report, num):
+        report.section(num, 'Performance')
+        traced = '' if self.memory else ' (not traced in this run)'
+        report.out('\nThe time and memory of each profiled stage and helper, by descending total time. Nested calls '
+                   + 'count towards', False)
+        report.out('their enclosing stage too, so the totals overlap. The peak is the most memory traced during a '
+                   + 'single call,', False)
+        report.out('above the memory in use when it started' + traced + '.', False)
+        report.out('\n{:<56}{:>10}{:>16}{:>16}{:>16}'.format('name', 'calls', 'total (s)', 'mean (s)', 'peak (MB)'),
+                   False)
+        for result in self.results():
+            report.out('{:<56}{:>10}{:>16.4f}{:>16.4f}{:>16.1f}'.format(
+                result['name'][:55], result['calls'], result['total_seconds'], result['mean_seconds'],
+                result['peak_mb']), False)
+
+
+# The profiler of this process, shared by the @profile decorators of the advance modules
+PROFILER = Profiler()
+profile = PROFILER.profile
+block = PROFILER.block
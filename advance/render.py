@@ -0,0 +1,117 @@
+# PURPOSE: Render a batch of figures in a process pool, headless.
+# Each worker process selects the non-interactive Agg backend and imports matplotlib once, then runs the figure scripts
+# it is given as __main__ (from the script's folder, since the scripts locate their inputs and outputs relative to
+# it), or calls the figure functions it is given (ex. the log task figures of advance/viz.py). A failing figure is
+# reported with its traceback, and the rest of the batch still renders.
+# Usage: python -m advance.render [-j PROCESSES] SCRIPT [SCRIPT ...]
+
+import argparse
+import multiprocessing
+import os
+import runpy
+import sys
+import time
+import traceback
+
+
+# Select the Agg backend, and import pyplot once for the worker's lifetime
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot # noqa: F401
+
+
+# Run the given figure script as __main__ from its folder, closing its figures afterwards
+# Return: a tuple of (script path, run time in seconds, the traceback string, or None if the script succeeded)
+def render_script(path):
+    import matplotlib.pyplot as plt
+
+    path = os.path.abspath(path)
+    folder = os.path.dirname(path)
+    cwd = os.getcwd()
+    start = time.perf_counter()
+    error = None
+    try:
+        os.chdir(folder)
+        if folder not in sys.path:
+            sys.path.insert(0, folder)
+        runpy.run_path(path, run_name='__main__')
+    except SystemExit as e: # a script calling sys.exit must not stop the worker
+        if e.code not in (None, 0):
+            error = traceback.format_exc()
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        plt.close('all')
+        os.chdir(cwd)
+    return path, time.perf_counter() - start, error
+
+
+# Render the given figure scripts in a pool of the given number of processes (by default, one per core)
+# Return: the list of render_script results, in the order of the given paths
+def render_figures(paths, processes=None):
+    return _map(render_script, list(paths), processes)
+
+
+# Call the given figure function with the given arguments, closing its figures afterwards
+# Input: a tuple of (name, function, args tuple, kwargs dict); the function must be importable (ex. from advance.viz)
+# Return: a tuple of (name, run time in seconds, the traceback string, or None if the call succeeded)
+def render_call(call):
+    import matplotlib.pyplot as plt
+
+    name, func, args, kwargs = call
+    start = time.perf_counter()
+    error = None
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        plt.close('all')
+    return name, time.perf_counter() - start, error
+
+
+# Render the given figure calls (see render_call) in a pool of the given number of processes (by default, one per core)
+# Return: the list of render_call results, in the order of the given calls
+def render_calls(calls, processes=None):
+    return _map(render_call, list(calls), processes)
+
+
+# Run the given render function over the given items in a pool of Agg workers (in this process if only one is needed)
+def _map(func, items, processes):
+    if not items:
+        return []
+    processes = min(processes or os.cpu_count() or 1, len(items))
+    if processes == 1:
+        _init_worker()
+        return [func(item) for item in items]
+
+    with multiprocessing.Pool(processes, initializer=_init_worker) as pool:
+        return pool.map(func, items, chunksize=1)
+
+
+# Print a line for each of the given render results, with the tracebacks of the failed figures
+# Return: the number of failed figures
+def report_results(results):
+    failed = 0
+    for path, seconds, error in results:
+        name = os.path.basename(path)
+        if error is None:
+            print('Rendered ' + name + ' (' + format(seconds, '.1f') + 's)')
+        else:
+            failed += 1
+            print('FAILED ' + name + ' (' + format(seconds, '.1f') + 's)\n' + error)
+    print(str(len(results) - failed) + ' of ' + str(len(results)) + ' figures rendered')
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render figure scripts in a process pool.')
+    parser.add_argument('scripts', nargs='+', help='the figure scripts to render')
+    parser.add_argument('-j', '--processes', type=int, default=None, help='the number of processes (default: cores)')
+    args = parser.parse_args(argv)
+    return 1 if report_results(render_figures(args.scripts, args.processes)) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
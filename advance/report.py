@@ -0,0 +1,83 @@
+# PURPOSE: Write the log task report through one buffered file handle.
+# Lines longer than the report width are wrapped into width-character chunks, lines can be echoed to the console, and
+# the handle is flushed once per section (and on read/close) rather than reopened for every line. A writer without a
+# path keeps the report in memory (ex. for a pipeline stage which returns the report text).
+
+import io
+
+# Console echo levels: no lines, the lines marked for the console (the default), or every line
+ECHO_NONE, ECHO_MARKED, ECHO_ALL = 0, 1, 2
+
+
+# Split the given string into a list of max-width-character chunks (an empty string has no chunks)
+def wrap(text, width):
+    return [text[i:i + width] for i in range(0, len(text), width)]
+
+
+class ReportWriter:
+    # Input: the report file path (None to keep the report in memory), the max line length, and the console echo level
+    def __init__(self, path, width=120, echo=ECHO_MARKED):
+        self.path = path
+        self.width = width
+        self.echo = echo
+        self.line = '-' * width
+        self._file = None
+        self._memory = io.StringIO() if path is None else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Get the open report handle, opening it (in append mode) on first use
+    def _handle(self):
+        if self._file is None:
+            self._file = self._memory if self.path is None else open(self.path, 'a')
+        return self._file
+
+    # Add the given string as a line to the report, and print it to the console if it is marked for the console
+    # (and the echo level allows it)
+    def out(self, text, to_console=True):
+        self._handle().write(''.join(chunk + '\n' for chunk in wrap(text, self.width)))
+        if self.echo == ECHO_ALL or (self.echo == ECHO_MARKED and to_console):
+            print(text)
+
+    # Write any buffered lines to the report file
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    # Output a new section header to the report; the previous section is flushed first
+    def section(self, num, name):
+        self.flush()
+        self.out('\n', False)
+        self.out(self.line, False)
+        self.out('Section ' + str(num) + ': ' + name, False)
+        self.out(self.line, False)
+
+    # Reset the report, adding the given header
+    def clear(self, header):
+        self.close()
+        if self.path is None:
+            self._memory = io.StringIO()
+        else:
+            self._file = open(self.path, 'w')
+        self.out(self.line, False)
+        self.out(header, False)
+        self.out(self.line, False)
+        self.flush()
+
+    # Get the current state of the report
+    def read(self):
+        if self.path is None:
+            return self._memory.getvalue()
+        self.flush()
+        with open(self.path, 'r') as f:
+            return f.read()
+
+    # Flush and close the report handle; it is reopened if more lines are added
+    def close(self):
+        if self._file is not None and self.path is not None:
+            self._file.close()
+        self._file = None
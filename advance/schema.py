@@ -0,0 +1,81 @@
+# PURPOSE: Declare the column types of the ADVANCE master tables, and load every table through them.
+# Person, award, and Carnegie IDs are read as nullable 32-bit integers, organization IDs as nullable 64-bit integers
+# (they are numbers of up to ten digits, above the 32-bit range), years as nullable 16-bit integers, and the
+# enumerations (ex. job_category, gender) as categoricals, so that the tables take a fraction of the memory of bare
+# read_csv loads and comparisons run on typed arrays rather than on Python objects. Year cells which hold more than a
+# year (ex. "2005-2007") are parsed to their leading or trailing year. The tables are loaded through the columnar
+# cache (see cache.py).
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from advance.cache import read_csv_cached
+from advance.profiling import profile
+
+ID = 'Int32'
+ORG_ID = 'Int64' # ex. org 4012281303
+YEAR = 'Int16'
+
+# A four-digit year at the start of a cell, or else at its end
+YEAR_PATTERN = r'^([0-9]{4})|([0-9]{4})$'
+CATEGORY = 'category'
+
+# The declared columns of each table: table -> {column: dtype}. Columns which are not declared (ex. names and titles)
+# are loaded as read_csv parses them.
+TABLES = {
+    'individual_jobs': {'person_id': ID, 'employer_id': ORG_ID, 'job_category': CATEGORY,
+                        'job_start_year': YEAR, 'job_end_year': YEAR},
+    'individual_awards': {'person_id': ID, 'award_id': ID, 'award_org_id': ORG_ID, 'award_start_year': YEAR,
+                          'award_role_cat': CATEGORY, 'award_type': CATEGORY},
+    'individual_demographics': {'person_id': ID, 'gender': CATEGORY, 'race_ethnicity_urm': CATEGORY,
+                                'division': CATEGORY},
+    'awards': {'award_id': ID, 'awarded_org_id': ORG_ID, 'cohort': YEAR, 'award_start_year': YEAR,
+               'award_end_year': YEAR},
+    'organizations': {'org_id': ORG_ID, 'carnegie_id': ID, 'org_type_based_on_awards': CATEGORY},
+}
+
+
+# Convert the given numeric column to the given nullable integer dtype; cells which are not numbers, not whole, or out
+# of the dtype's range become missing (ex. a year of "unknown")
+def to_nullable_int(values, dtype):
+    values = pd.to_numeric(values, errors='coerce').astype('float64')
+    info = np.iinfo(dtype.lower())
+    values = values.where((values == values.round()) & values.between(info.min, info.max))
+    return values.astype(dtype)
+
+
+# Parse the given year column. Numbers are kept if they are whole years, and other cells give their leading four-digit
+# year, or else their trailing one (ex. "2005-2007" is 2005, "c. 1998" is 1998). Each distinct cell is parsed once and
+# the years are mapped back to the rows.
+# Return: the years as a nullable 16-bit integer series, and the number of non-missing cells which have no year
+def parse_years(values):
+    if is_numeric_dtype(values):
+        years = to_nullable_int(values, YEAR)
+        return years, int((values.notna() & years.isna()).sum())
+
+    codes, uniques = pd.factorize(values) # missing cells get the code -1
+    found = pd.Series(uniques, dtype=object).astype(str).str.extract(YEAR_PATTERN)
+    parsed = to_nullable_int(found[0].fillna(found[1]), YEAR)
+    years = pd.Series(parsed.array.take(codes, allow_fill=True), index=values.index, name=values.name)
+    return years, int(parsed.isna().to_numpy()[codes[codes != -1]].sum())
+
+
+# Load the given master table from the given CSV path, with its declared column types
+# Input: the table name (a key of TABLES), the CSV path, and (optionally) the list of columns to load
+# Return: the typed df; its attrs['unparseable_years'] holds the number of cells of each year column without a year
+@profile()
+def read_table(name, path, usecols=None):
+    declared = TABLES[name]
+    kwargs = {} if usecols is None else {'usecols': list(usecols)}
+
+    # IDs and categories are parsed into their dtypes directly; years are parsed afterwards, since the extracts contain
+    # some non-numeric year cells
+    dtype = {col: t for col, t in declared.items() if t != YEAR and (usecols is None or col in usecols)}
+    df = read_csv_cached(path, dtype=dtype, **kwargs)
+    unparseable = {}
+    for col, t in declared.items():
+        if t == YEAR and col in df.columns and str(df[col].dtype) != YEAR:
+            df[col], unparseable[col] = parse_years(df[col])
+    df.attrs['unparseable_years'] = unparseable
+    return df
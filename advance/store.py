@@ -0,0 +1,74 @@
+# PURPOSE: Index the individual jobs, awards, demographics, and organizations tables once by their entity ids,
+# so that per-person and per-award lookups are a dictionary hit and a positional slice rather than a full-table scan.
+
+import numpy as np
+
+
+class EntityStore:
+    # The indexed tables: name -> (source table, key column, sort column)
+    LAYOUT = {'jobs': ('jobs', 'person_id', 'job_start_year'),
+              'awards': ('awards', 'person_id', 'award_start_year'),
+              'grantees': ('awards', 'award_id', None),
+              'dems': ('dems', 'person_id', None),
+              'orgs': ('orgs', 'org_id', None)}
+
+    def __init__(self, jobs=None, awards=None, dems=None, orgs=None):
+        self._tables = {}
+        self._slices = {}
+        self.update(jobs=jobs, awards=awards, dems=dems, orgs=orgs)
+
+    # (Re)index the given source tables; this must be called after a table has been cleaned or relabeled,
+    # since the store holds its own sorted copy of each table
+    def update(self, jobs=None, awards=None, dems=None, orgs=None):
+        sources = {'jobs': jobs, 'awards': awards, 'dems': dems, 'orgs': orgs}
+        for name, (source, key, sort_by) in self.LAYOUT.items():
+            if sources[source] is not None:
+                self._build(name, sources[source], key, sort_by)
+
+    # Sort the table by key (and sort column) so that each key's rows are contiguous, then record each key's bounds.
+    # The sort is stable, so rows with equal keys keep their order in the source table.
+    def _build(self, name, df, key, sort_by):
+        cols = [key] if sort_by is None else [key, sort_by]
+        table = df.sort_values(cols, kind='mergesort')
+        table = table[table[key].notna()]
+        keys = table[key].to_numpy()
+
+        if len(keys) == 0:
+            bounds = {}
+        else:
+            starts = np.r_[0, np.flatnonzero(keys[1:] != keys[:-1]) + 1]
+            stops = np.r_[starts[1:], len(keys)]
+            bounds = dict(zip(keys[starts].tolist(), zip(starts.tolist(), stops.tolist())))
+
+        self._tables[name] = table
+        self._slices[name] = bounds
+
+    # Get the rows of the given indexed table for the given key (an empty slice if there are none).
+    # The result is a positional slice of the indexed table; copy it before modifying it.
+    def _slice(self, name, key):
+        start, stop = self._slices[name].get(key, (0, 0))
+        return self._tables[name].iloc[start:stop]
+
+    # Get the jobs for the given person, sorted by start year
+    def jobs(self, person_id):
+        return self._slice('jobs', person_id)
+
+    # Get the awards for the given person, sorted by start year
+    def awards(self, person_id):
+        return self._slice('awards', person_id)
+
+    # Get the grantees that worked on the given award
+    def grantees(self, award_id):
+        return self._slice('grantees', award_id)
+
+    # Get the demographics row for the given person
+    def dems(self, person_id):
+        return self._slice('dems', person_id)
+
+    # Get the row for the given organization
+    def org(self, org_id):
+        return self._slice('orgs', org_id)
+
+    # Get the ids present in the given indexed table
+    def ids(self, name):
+        return list(self._slices[name])
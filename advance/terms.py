@@ -0,0 +1,115 @@
+# PURPOSE: Count the terms occurring in a text column (ex. job titles) for every category at once, and check job
+# titles against per-category keys. The column is tokenized once, the frequencies for all categories come from one
+# groupby, and the top-k terms of any category are then read from that build.
+
+import functools
+import hashlib
+
+import numpy as np
+import pandas as pd
+from nltk.corpus import stopwords
+
+from advance.profiling import profile
+
+
+# The English stop words as a set (stopwords.words() rebuilds and returns a list on every call)
+@functools.lru_cache(maxsize=None)
+def english_stopwords():
+    return frozenset(stopwords.words('english'))
+
+
+# Remove the non-alphanumeric characters (other than '-') from the given term
+def alnum_term(term):
+    return ''.join(c for c in term if c.isalnum() or c == '-')
+
+
+class TermFrequencies:
+    # Tokenize the given term column and count the terms of every category in the given category column.
+    # Terms are split on whitespace and stripped to alphanumeric characters; stop words and empty terms are skipped.
+    def __init__(self, df, col_cat, col_terms):
+        self.col_cat = col_cat
+        self.col_terms = col_terms
+        self.sizes = df[col_cat].value_counts().to_dict() # rows per category (including empty terms)
+
+        titles = df.loc[df[col_terms].notna(), [col_cat, col_terms]]
+        terms = titles[col_terms].astype(str).str.split().explode().dropna()
+
+        # Each distinct raw token is cleaned once
+        cleaned = {token: alnum_term(token) for token in terms.unique()}
+        terms = terms.map(cleaned)
+        frame = pd.DataFrame({'cat': titles.loc[terms.index, col_cat].to_numpy(), 'term': terms.to_numpy(),
+                              'pos': np.arange(len(terms))})
+        frame = frame[(frame['term'] != '') & ~frame['term'].isin(english_stopwords())]
+
+        # Ties in frequency are broken by first occurrence, as with Counter.most_common
+        counts = (frame.groupby(['cat', 'term'], sort=False)
+                  .agg(count=('pos', 'size'), first=('pos', 'min')).reset_index()
+                  .sort_values(['count', 'first'], ascending=[False, True], kind='mergesort'))
+        self.counts = counts
+        self._ranked = {cat: list(zip(group['term'], group['count'].tolist()))
+                        for cat, group in counts.groupby('cat', sort=False)}
+
+    # Get the k most frequent terms of the given category, as a list of (term, count) tuples
+    def top(self, cat, k):
+        return self._ranked.get(cat, [])[:k]
+
+    # Get the k most frequent terms of each of the given categories (default: every category)
+    def top_all(self, k, cats=None):
+        cats = list(self._ranked) if cats is None else cats
+        return {cat: self.top(cat, k) for cat in cats}
+
+    # Get the number of rows in the given category
+    def size(self, cat):
+        return self.sizes.get(cat, 0)
+
+
+_last_builds = {}
+
+# Get the term frequencies of the given columns of the given df. The previous build for the same columns is reused
+# as long as their contents are unchanged, so that callers asking about the same data share one tokenization.
+@profile()
+def term_frequencies(df, col_cat, col_terms):
+    hashed = pd.util.hash_pandas_object(df[[col_cat, col_terms]], index=False).to_numpy()
+    digest = hashlib.sha1(hashed.tobytes()).hexdigest()
+
+    build = _last_builds.get((col_cat, col_terms))
+    if build is None or build[0] != digest:
+        build = (digest, TermFrequencies(df, col_cat, col_terms))
+        _last_builds[(col_cat, col_terms)] = build
+    return build[1]
+
+
+# The separators between the terms of a job title in the category-fit check
+FIT_SEPARATORS = r'[,_\- :/]'
+
+# Flag the job titles which may not fit in their assigned category: the titles which contain none of the category's
+# keys, or any of its antikeys. Every title is split into a long (row, category, term) token table once, which is
+# joined to the per-category key and antikey table, so the whole jobs table is checked with a few set operations.
+# Input: jobs df, dict of category -> keys, dict of category -> antikeys, list of categories to check
+# Return: a df of (person_id, job_title, category, reason) rows, in the order of the given categories and then of the
+# jobs df, where reason is 'antikey' (the title contains an antikey) or 'no key' (it contains none of the keys)
+@profile()
+def find_category_misfits(jobs, keys, antikeys, cats):
+    cat_order = {cat: i for i, cat in enumerate(cats)}
+    titles = jobs.loc[jobs['job_category'].isin(cats) & jobs['job_title'].notna(),
+                      ['person_id', 'job_title', 'job_category']].reset_index(drop=True)
+    titles = titles.rename(columns={'job_category': 'category'}).astype({'category': object})
+
+    tokens = titles['job_title'].astype(str).str.split(FIT_SEPARATORS, regex=True).explode()
+    token_table = pd.DataFrame({'row': tokens.index, 'term': tokens.to_numpy(),
+                                'category': titles['category'].to_numpy()[tokens.index]})
+
+    key_table = pd.DataFrame([(cat, term, 'key') for cat in cats for term in keys.get(cat, [])]
+                             + [(cat, term, 'antikey') for cat in cats for term in antikeys.get(cat, [])],
+                             columns=['category', 'term', 'kind']).drop_duplicates()
+    hits = token_table.merge(key_table, on=['category', 'term'])
+
+    has_key = titles.index.isin(hits.loc[hits['kind'] == 'key', 'row'])
+    has_antikey = titles.index.isin(hits.loc[hits['kind'] == 'antikey', 'row'])
+
+    flagged = ~has_key | has_antikey
+    misfits = titles[flagged].copy()
+    misfits['reason'] = np.where(has_antikey[flagged], 'antikey', 'no key')
+    misfits['order'] = misfits['category'].map(cat_order)
+    misfits = misfits.sort_values('order', kind='mergesort').drop(columns='order')
+    return misfits.reset_index(drop=True)[['person_id', 'job_title', 'category', 'reason']]
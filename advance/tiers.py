@@ -0,0 +1,95 @@
+# PURPOSE: Define the fallback tiers which the log task uses to locate each person's and award role's first, highest,
+# and last jobs (see positions.locate). The notebook, the log task pipeline (log_task.py), and the subtask scripts share
+# these definitions.
+# Each tier is a (condition, pick) pair: a function giving the mask of a person's candidate jobs (None for all of them)
+# and the way a job is picked among them (FIRST, LAST, LATEST, or ANY).
+
+from advance.positions import FIRST, LAST, LATEST, ANY
+
+
+# Determine whether each candidate job was held in the year the person entered the network (their first award year)
+def held_in_first_year(jobs):
+    return (jobs['job_start_year'] <= jobs['first_year']) & (jobs['job_end_year'] >= jobs['first_year'])
+
+
+# Determine whether each candidate job did not end before the person entered the network
+def not_ended_by_first_year(jobs):
+    return jobs['job_end_year'] >= jobs['first_year']
+
+
+# Determine whether each candidate job was at the institution of the person's first award
+def at_first_org(jobs):
+    return jobs['employer_id'] == jobs['first_org']
+
+
+# Role-level: determine whether each candidate job was at the institution of the given award
+def at_award_org(jobs):
+    return jobs['employer_id'] == jobs['award_org_id']
+
+
+# Role-level: determine whether each candidate job was held around the time of the given award
+# (the job cannot start after the award ends, or end before the award starts)
+def held_during_award(jobs):
+    return (jobs['job_start_year'] <= jobs['award_end_year']) & (jobs['job_end_year'] >= jobs['award_start_year'])
+
+
+# The first job is the best guess at the position a person had when they entered the network (person-level),
+# or when they joined the given grant (role-level). Each list holds the fallbacks in order of preference; within a tier,
+# the closest (LAST) or first (FIRST) start year is picked, and ties are broken using the job hierarchy.
+
+# Person-level:
+# - The closest job at the first award institution which was held when they entered the network
+# - If there are none, the first job at the first award institution which didn't end before they entered the network
+# - If there are no jobs at the first award institution, the closest job which was held when they entered the network
+# - If there are no jobs which start at or before their entrance into the network, the first job after entrance
+# - If all their jobs end before they enter the network, the most recent job they had
+person_first_job_tiers = [(lambda jobs: at_first_org(jobs) & held_in_first_year(jobs), LAST),
+                          (lambda jobs: at_first_org(jobs) & not_ended_by_first_year(jobs), FIRST),
+                          (held_in_first_year, LAST),
+                          (not_ended_by_first_year, FIRST),
+                          (None, LAST)]
+
+# Role-level:
+# - The closest job at the award institution which was held around the time of the award
+# - If there are none, the first job which didn't end before the award started
+# - If there are none, the first job at the award institution which didn't end before they entered the network
+# - Then the same fallbacks as at the person level
+role_first_job_tiers = [(lambda jobs: at_award_org(jobs) & held_during_award(jobs), LAST),
+                        (lambda jobs: jobs['job_end_year'] >= jobs['award_start_year'], FIRST),
+                        (lambda jobs: at_award_org(jobs) & not_ended_by_first_year(jobs), FIRST)
+                        ] + person_first_job_tiers[2:]
+
+
+# The highest job is the highest position a person had throughout their career after entering the network
+# (person-level), or the best guess at the highest position they had throughout their involvement in the given grant
+# (role-level). Each list holds the fallbacks in order of preference.
+
+# Person-level:
+# - The jobs they had after they entered the ADVANCE network
+# - If they have no jobs after entering the network, the highest job that this person ever had
+person_highest_job_tiers = [(not_ended_by_first_year, ANY),
+                            (None, ANY)]
+
+# Role-level:
+# - The jobs they had at the given award institution around the time of the award
+# - Then the same fallbacks as at the person level
+role_highest_job_tiers = [(lambda jobs: at_award_org(jobs) & held_during_award(jobs), ANY)] + person_highest_job_tiers
+
+
+# The last job is the most recent position a person had (person-level), or the best guess at the last position they
+# had while working on the given grant (role-level). Each list holds the fallbacks in order of preference; within a
+# tier, the most recent start year is picked, and ties are broken by the most recent end year, then the job hierarchy.
+
+# Person-level:
+# - The jobs they had after entering the network
+# - If there are none, all of their jobs
+person_last_job_tiers = [(not_ended_by_first_year, LATEST),
+                         (None, LATEST)]
+
+# Role-level:
+# - The jobs at the given award institution around the time of the award
+# - If there are none, the closest jobs around the award period, at any institution
+# - If there are none, all of their jobs
+role_last_job_tiers = [(lambda jobs: at_award_org(jobs) & held_during_award(jobs), LATEST),
+                       (held_during_award, LATEST),
+                       (None, LATEST)]
@@ -0,0 +1,104 @@
+# PURPOSE: Draw the log task figures: the most frequent terms per category, and the first/highest/last job category
+# pies. The figures are drawn from their arguments alone (no notebook state), so that the notebook can show them
+# inline and a render.py process pool can render them headless (see render_calls).
+
+import math
+
+import matplotlib.pyplot as plt
+import seaborn as sns
+from matplotlib.lines import Line2D
+
+from advance.terms import term_frequencies
+
+
+# Draw the k most frequent terms of each category as a grid of horizontal bar charts, and save it to the given path
+# Input: df, column with category names, column with category terms, list of sorted column values, k (number of
+# terms/bars per category), the PNG path (None to skip saving), and (optionally) the prebuilt term frequencies
+# Return: a string doc representing the numerical data
+def kmf_figure(df, col_cat, col_terms, cat_vals, k, path=None, freqs=None):
+    if freqs is None:
+        freqs = term_frequencies(df, col_cat, col_terms) # shared with the category-fit checks
+
+    n = len(cat_vals) # number of categories
+    b = 3 if n < 10 else 4  # number of columns
+    a = int(math.ceil(n / b))  # number of rows
+
+    colors = sns.color_palette("hls", n) # get a distinct color for each category
+
+    fig = plt.figure(figsize=(22,16))
+
+    # Create title strings from column names
+    cat_str = col_cat.replace('_', " ")
+    term_str = col_terms.replace('_', " ")
+    if not 'category' in cat_str:
+        cat_str = cat_str.replace('cat', "category")
+
+    # We'll also build a string doc representing the numerical data
+    doc = '\nThe ' + str(k) + ' most frequent ' + term_str + ' terms in each ' + cat_str.lower() + ' are:'
+
+    for c, cat in enumerate(cat_vals, start=1):
+        freq = freqs.top(cat, k)
+        lab = cat + ' (n=' + str(freqs.size(cat)) + ')'
+
+        # Add this category's k-most frequent terms to the growing doc
+        doc += '\n' + lab
+        for val in freq:
+            doc += ('\n  - ' + val[0] + ': ' + str(val[1]))
+
+        # Graph this category as a subplot
+        ax = plt.subplot(a, b, c)
+        plt.title(lab, fontsize=25)
+        ax.tick_params(axis='x', which='major', labelsize=15)
+        plt.xlabel('frequency', fontsize=20)
+
+        # If this category doesn't have k values, add in some blank pads
+        padded = (freq + [('', 0)] * k)[:k]
+
+        plt.barh(range(k), [val[1] for val in padded], align='center', color=colors[c - 1])
+        plt.yticks(range(k), [val[0] for val in padded], fontsize=15 if k < 16 else 12)
+        ax.invert_yaxis()  # labels read top-to-bottom
+
+    fig.suptitle(str(k) + ' Most Frequent ' + term_str.title() + ' Terms Per ' + cat_str.title(), fontsize=35)
+    plt.tight_layout(rect=(0, 0, 1, 0.92), w_pad=1.5, h_pad=2.5)
+    if path is not None:
+        plt.savefig(path)
+    return doc
+
+
+# Draw the first, highest, and last job categories of the given log df as three pies, and save them to the given path
+# Input: the log df (with first_job, highest_job, and last_job columns), the level name (ex. 'person'), the sorted job
+# categories, and the PNG path (None to skip saving)
+def triple_pie_figure(df, name, cats, path=None):
+    levels = ['first', 'highest', 'last']
+    COLORS = list(sns.color_palette("hls", len(cats) - 1))
+    COLORS.append('lightpink')
+    TEXT_COLOR = 'black'
+    fig = plt.figure(figsize=(28,12))
+
+    for c, level in enumerate(levels, start=1):
+        # Count each category of this level's jobs
+        totals = df[level + '_job'].value_counts().reindex(cats, fill_value=0)
+        n = totals.sum()
+
+        def format_label(cat):
+            perc = 100*totals[cat]/n
+            return cat + f': {perc:.1f}%'
+
+        # Graph this category as a subplot
+        ax = plt.subplot(1, 3, c)
+        plt.title(level.title() + ' Jobs', fontsize=40, color=TEXT_COLOR)
+
+        ax.pie(totals.to_numpy(), colors=COLORS, startangle=90, wedgeprops=dict(linewidth=2, edgecolor='w'))
+
+        # Make the legend
+        custom_lines = [Line2D([0], [0], color=color, marker="s", markersize=12, linewidth=0, label=format_label(lab))
+                        for color, lab in zip(COLORS, cats)]
+        leg = plt.legend(handles=custom_lines, loc="center", ncol=2, framealpha=0, bbox_to_anchor=(0.55, -0.2))
+        for text in leg.get_texts():
+            plt.setp(text, color = TEXT_COLOR, fontsize=22)
+
+    fig.suptitle("Job Categories for University ADVANCE Network Individuals, "
+                 + name.title() + "-Level (n=" + str(n) + ")", fontsize=46, color=TEXT_COLOR)
+    fig.tight_layout()
+    if path is not None:
+        plt.savefig(path, dpi=fig.dpi)
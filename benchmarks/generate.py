@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# PURPOSE: Generate a synthetic ADVANCE dataset which follows the schema of the master tables (see advance/schema.py),
+# so that the processing code can be run and timed at scale without the proprietary inputs.
+# INPUT: The scale (1 = the 1,590 people of the current extract) and the random seed.
+# OUTPUT: A folder laid out like the repository's data folders:
+# - Input/: the log task CSVs (awards_02, individual_awards, individual_demographics_02, individual_jobs_02,
+#   organizations), with the log task's job categories
+# - data_master/: the figure scripts' master CSVs (awards, individual_awards, individual_demographics, individual_jobs,
+#   organizations), with the figure extract's job categories (ex. "director_r")
+# - org_network/output/ and small visualizations/output/: the processed job mobility edges and pinpointed jobs which
+#   figure 20 reads
+# The tables reproduce the features of the real data which the processing code handles: ten-digit organization IDs,
+# missing and non-numeric years, several jobs starting in the same year, several grants in a person's first year,
+# several roles per grant, untrimmed spaces, missing demographics, and missing job categories. Every table is generated
+# with whole-array operations, so that a 1000x dataset (1.59M people) takes minutes rather than hours.
+# USAGE: python generate.py SCALE [--seed SEED] [--out FOLDER] (default folder: data/<SCALE>x, next to this file)
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Shared ADVANCE processing code, located in the repository root
+sys.path.append(os.path.join(HERE, '..'))
+from advance.categories import ROLES
+from advance.figures import PI_ROLES
+
+BASE_PEOPLE = 1590 # people in the current extract (scale 1)
+
+# Table sizes per person, from the current extract
+ORGS_PER_PERSON = 0.4
+AWARDS_PER_PERSON = 0.12
+
+# The range of the org ids: ten-digit numbers like the real ones (ex. 4012281303), most of them above the 32-bit range
+ORG_IDS = (1000000000, 5000000000)
+
+# The job categories with their shares of the jobs (the rest of the jobs have no category)
+JOB_SHARES = {'admin_leadership': 0.06, 'director_managerial': 0.04, 'chair_dept': 0.07, 'director_research': 0.05,
+              'director_chair': 0.02, 'director_diversity': 0.03, 'faculty': 0.36, 'staff_management': 0.05,
+              'staff_research': 0.06, 'adjunct': 0.03, 'postdoc': 0.06, 'non-uni': 0.13, 'deceased': 0.005}
+MISSING_CATEGORY = 0.03
+
+# The job titles of each category (a title is one of these, with a department or program appended)
+JOB_TITLES = {'admin_leadership': ['dean', 'associate dean', 'provost', 'vice provost', 'president', 'chief officer'],
+              'director_managerial': ['director', 'executive director', 'managing director'],
+              'chair_dept': ['chair', 'department chair', 'department head', 'chairman'],
+              'director_research': ['director of research', 'research center director'],
+              'director_chair': ['director and chair', 'program director and chair'],
+              'director_diversity': ['director of diversity', 'director of the advance program', 'diversity officer'],
+              'faculty': ['professor', 'associate professor', 'assistant professor', 'lecturer', 'profesor'],
+              'staff_management': ['program manager', 'research administrator', 'advisor'],
+              'staff_research': ['research scientist', 'researcher', 'research associate'],
+              'adjunct': ['adjunct professor', 'adjunct lecturer'],
+              'postdoc': ['postdoctoral fellow', 'postdoc', 'research fellow'],
+              'non-uni': ['engineer', 'consultant', 'program officer', 'ceo'],
+              'deceased': ['deceased']}
+DEPARTMENTS = ['biology', 'chemistry', 'physics', 'mathematics', 'sociology', 'psychology', 'engineering',
+               'computer science', 'economics', 'geology']
+
+# The figure extract's job categories, for each of the log task's job categories
+FIGURE_CATEGORIES = {'admin_leadership': 'admin', 'director_managerial': 'director_m', 'chair_dept': 'chair',
+                     'director_research': 'director_r', 'director_chair': 'director_c',
+                     'director_diversity': 'director_d', 'faculty': 'faculty', 'staff_management': 'staff',
+                     'staff_research': 'staff', 'adjunct': 'adjunct', 'postdoc': 'postdoc', 'non-uni': 'non-uni',
+                     'deceased': 'deceased'}
+
+# The award roles with their shares, and the award role category of each
+ROLE_SHARES = {'pi': 0.12, 'co-pi': 0.18, 'former pi': 0.02, 'former co-pi': 0.03, 'day-to-day manager': 0.06,
+               'researcher': 0.12, 'internal evaluator': 0.07, 'internal team member': 0.16,
+               'external advisor': 0.12, 'external evaluator': 0.07, 'external consultant': 0.05}
+ROLE_CATEGORIES = {'day-to-day manager': 'day-to-day', 'internal team member': 'researcher',
+                   **{role: 'grantee' for role in PI_ROLES}, **{role: role for role in ROLES.order}}
+
+AWARD_TYPES = {'it': 0.55, 'paid': 0.2, 'catalyst': 0.15, 'partnership': 0.1}
+
+# The demographic values with their shares (the rest are missing)
+GENDERS = {'woman': 0.55, 'man': 0.4}
+RACES = {'white': 0.6, 'asian': 0.18, 'urms': 0.14}
+DIVISIONS = {'science': 0.4, 'social science': 0.2, 'engineering': 0.25, 'medicine': 0.08, 'other': 0.04}
+
+PLACES = ['Northern', 'Southern', 'Eastern', 'Western', 'Central', 'Coastal', 'Mountain', 'Lake', 'River', 'Valley']
+
+
+# Draw n values from the given dict of value -> share; the share left over (if any) is drawn as missing
+def draw(rng, shares, n):
+    values = list(shares) + [None]
+    p = np.array(list(shares.values()) + [0.0])
+    p[-1] = max(0.0, 1 - p.sum())
+    return pd.Series(rng.choice(np.array(values, dtype=object), n, p=p / p.sum()))
+
+
+# Get the given numbers as year strings, with the given share of them missing and a few of them non-numeric
+def year_cells(rng, years, missing):
+    cells = pd.Series(years).astype('Int64').astype(str).str.replace('<NA>', '', regex=False)
+    roll = rng.random(len(cells))
+    cells[roll < missing] = ''
+    cells[(roll >= missing) & (roll < missing + 0.002)] = 'unknown'
+    return cells.replace('', np.nan)
+
+
+# Add a double or trailing space to the given share of the given strings (the trimming stage removes them)
+def untrimmed(rng, values, share=0.03):
+    roll = rng.random(len(values))
+    values = values.copy()
+    values[roll < share / 2] = values[roll < share / 2].str.replace(' ', '  ', n=1, regex=False)
+    values[(roll >= share / 2) & (roll < share)] = values[(roll >= share / 2) & (roll < share)] + ' '
+    return values
+
+
+# Generate the organizations: universities (most with a Carnegie id), colleges, institutes, and non-universities, with
+# distinct random ten-digit org ids (see ORG_IDS)
+def organizations(rng, n):
+    ids = ORG_IDS[0] + rng.choice(ORG_IDS[1] - ORG_IDS[0], n, replace=False)
+    num = np.arange(1, n + 1)
+    kind = rng.choice(4, n, p=[0.45, 0.15, 0.1, 0.3])
+    place = pd.Series(np.array(PLACES)[rng.integers(0, len(PLACES), n)]) + ' ' + pd.Series(num).astype(str)
+    names = np.select([kind == 0, kind == 1, kind == 2],
+                      ['University of ' + place, place + ' College', place + ' Institute of Technology'],
+                      place + pd.Series(rng.choice([' Corp', ' Foundation', ' Hospital', ' Laboratories'], n)))
+    carnegie = np.where((kind <= 1) & (rng.random(n) < 0.7), 100000 + num, np.nan)
+    return pd.DataFrame({'org_id': ids, 'org_name': untrimmed(rng, pd.Series(names)),
+                         'carnegie_id': pd.array(carnegie, dtype='Int64')})
+
+
+# Generate the awards of cohorts 1-9 (2001-2017), awarded to the first half of the organizations
+def awards_table(rng, n, orgs):
+    cohort = rng.integers(1, 10, n)
+    start = 1999 + 2 * cohort + rng.integers(0, 2, n)
+    award_orgs = orgs['org_id'].to_numpy()[:max(1, len(orgs) // 2)]
+    return pd.DataFrame({'award_id': np.arange(1, n + 1), 'awarded_org_id': rng.choice(award_orgs, n),
+                         'award_type': draw(rng, AWARD_TYPES, n), 'cohort': cohort,
+                         'award_start_year': start,
+                         'award_end_year': year_cells(rng, start + rng.integers(3, 6, n), 0.03)})
+
+
+# Generate the award roles: most people have one, some join several grants (a few of them two in their first year),
+# and some hold several roles on the same grant
+def individual_awards(rng, people, awards, orgs):
+    n = len(people)
+    by_year = awards.sort_values('award_start_year', kind='mergesort').reset_index(drop=True)
+    years = by_year['award_start_year'].to_numpy()
+
+    # Each person's first grant, and a second grant of the same start year for 5% of them
+    first = rng.integers(0, len(by_year), n)
+    lo = np.searchsorted(years, years[first], 'left')
+    hi = np.searchsorted(years, years[first], 'right')
+    same_year = lo + (rng.random(n) * (hi - lo)).astype(int)
+    twice = (rng.random(n) < 0.05) & (same_year != first)
+
+    # Later grants (about one person in five)
+    later_counts = rng.geometric(0.8, n) - 1
+    later_person = np.repeat(np.arange(n), later_counts)
+    later_award = rng.integers(0, len(by_year), len(later_person))
+
+    person = np.concatenate([np.arange(n), np.flatnonzero(twice), later_person])
+    award = np.concatenate([first, same_year[twice], later_award])
+
+    # A second role on the same grant for 10% of the roles
+    extra = rng.random(len(person)) < 0.1
+    person = np.concatenate([person, person[extra]])
+    award = np.concatenate([award, award[extra]])
+
+    roles = draw(rng, ROLE_SHARES, len(person))
+    chosen = by_year.iloc[award].reset_index(drop=True)
+    df = pd.DataFrame({'person_id': people['person_id'].to_numpy()[person],
+                       'name': people['name'].to_numpy()[person],
+                       'award_id': chosen['award_id'], 'award_role': roles,
+                       'award_type': chosen['award_type'], 'award_start_year': chosen['award_start_year'],
+                       'award_org_name': chosen['awarded_org_id'].map(orgs.set_index('org_id')['org_name']),
+                       'award_org_id': chosen['awarded_org_id'], 'award_role_cat': roles.map(ROLE_CATEGORIES)})
+    return df.sort_values(['person_id', 'award_start_year'], kind='mergesort').reset_index(drop=True)
+
+
+# Generate the jobs: a career of zero to a dozen positions per person, starting up to 20 years before their first
+# grant, with some jobs starting in the same year as the one before, at the person's first grant institution half of
+# the time (and at another grant institution a quarter of the time), and with missing or non-numeric years and
+# missing categories
+def individual_jobs(rng, people, roles, orgs):
+    n = len(people)
+    counts = rng.poisson(3.2, n)
+    person = np.repeat(np.arange(n), counts)
+    order = np.arange(len(person)) - np.repeat(np.cumsum(counts) - counts, counts) # job number within the person
+
+    first_years = roles.groupby('person_id')['award_start_year'].min()
+    first_years = first_years.reindex(people['person_id']).fillna(2008).to_numpy()
+    first_orgs = roles.drop_duplicates('person_id').set_index('person_id')['award_org_id']
+    first_orgs = first_orgs.reindex(people['person_id']).fillna(orgs['org_id'].iloc[0]).to_numpy()
+
+    # Start years: a career start before the first grant, then gaps of 0 (same year) to several years
+    career_start = first_years - rng.integers(0, 21, n)
+    gaps = np.where(rng.random(len(person)) < 0.15, 0, rng.geometric(0.3, len(person)))
+    gaps[order == 0] = 0
+    starts = career_start[person] + pd.Series(gaps).groupby(person).cumsum().to_numpy()
+    ends = starts + rng.integers(1, 12, len(person))
+
+    cats = pd.Series(list(JOB_SHARES))
+    shares = np.array(list(JOB_SHARES.values())) * (1 - MISSING_CATEGORY) / sum(JOB_SHARES.values())
+    category = draw(rng, dict(zip(cats, shares)), len(person))
+
+    # Titles: a title of the category, with a department appended to most of them
+    titles = _titles_by_category(rng, category)
+    with_dept = rng.random(len(person)) < 0.7
+    titles[with_dept] = titles[with_dept] + ', ' + pd.Series(rng.choice(DEPARTMENTS, len(person)))[with_dept]
+
+    award_orgs = roles['award_org_id'].unique()
+    roll = rng.random(len(person))
+    employer = np.select([roll < 0.5, roll < 0.75], [first_orgs[person], rng.choice(award_orgs, len(person))],
+                         rng.choice(orgs['org_id'].to_numpy(), len(person)))
+    ids = people['person_id'].to_numpy()[person]
+    return pd.DataFrame({'person_id': ids, 'employer_id': employer.astype(int), 'job_category': category,
+                         'job_start_year': year_cells(rng, starts, 0.08), 'job_end_year': year_cells(rng, ends, 0.25),
+                         'job_title': untrimmed(rng, titles),
+                         'bio_urls': 'https://example.edu/people/' + pd.Series(ids).astype(str)})
+
+
+# Draw a title of each given category (a NaN category draws a faculty title), category by category
+def _titles_by_category(rng, category):
+    titles = pd.Series(index=category.index, dtype=object)
+    filled = category.fillna('faculty')
+    for cat, options in JOB_TITLES.items():
+        mask = (filled == cat).to_numpy()
+        titles[mask] = rng.choice(options, mask.sum())
+    return titles
+
+
+# Label each organization by the types of the awards it received (ex. "it and non-it", or "no awards")
+def org_award_types(orgs, awards):
+    is_it = (awards['award_type'] == 'it').groupby(awards['awarded_org_id'])
+    it, non_it = is_it.any(), ~is_it.all()
+    it = it.reindex(orgs['org_id'], fill_value=False).to_numpy()
+    non_it = non_it.reindex(orgs['org_id'], fill_value=False).to_numpy()
+    return np.select([it & non_it, it, non_it], ['it and non-it', 'it only', 'non-it only'], 'no awards')
+
+
+# Generate the five master tables at the given scale (1 = the size of the current extract), with the log task's job
+# categories
+# Return: a dict of table name -> df
+def generate(scale=1, seed=0):
+    rng = np.random.default_rng(seed)
+    n = max(10, int(round(BASE_PEOPLE * scale)))
+
+    orgs = organizations(rng, max(20, int(round(n * ORGS_PER_PERSON))))
+    awards = awards_table(rng, max(5, int(round(n * AWARDS_PER_PERSON))), orgs)
+    orgs['org_type_based_on_awards'] = org_award_types(orgs, awards)
+
+    ids = np.arange(1, n + 1)
+    people = pd.DataFrame({'person_id': ids, 'name': untrimmed(rng, 'Person ' + pd.Series(ids).astype(str)),
+                           'gender': draw(rng, GENDERS, n), 'race_ethnicity_urm': draw(rng, RACES, n),
+                           'division': draw(rng, DIVISIONS, n)})
+    roles = individual_awards(rng, people, awards, orgs)
+    jobs = individual_jobs(rng, people, roles, orgs)
+    return {'organizations': orgs, 'awards': awards, 'individual_awards': roles,
+            'individual_demographics': people, 'individual_jobs': jobs}
+
+
+# Get the figure scripts' extract of the given tables: the jobs with the figure extract's job categories, the job
+# mobility edges (each change of employer after the person's first grant), and the award roles with each person's
+# pinpointed job (their job starting closest before their first grant) and demographics
+# Return: a dict of table name -> df, with the master tables and the two processed tables
+def figure_extract(tables):
+    extract = dict(tables)
+    jobs = tables['individual_jobs']
+    jobs = jobs.assign(job_category=jobs['job_category'].map(FIGURE_CATEGORIES))
+    extract['individual_jobs'] = jobs
+
+    starts = pd.to_numeric(jobs['job_start_year'], errors='coerce')
+    first_years = tables['individual_awards'].groupby('person_id')['award_start_year'].min()
+    after = jobs[(starts >= jobs['person_id'].map(first_years)).to_numpy()]
+    after = after.assign(start=starts).sort_values(['person_id', 'start'], kind='mergesort')
+    prev_org = after.groupby('person_id')['employer_id'].shift()
+    moved = prev_org.notna() & (prev_org != after['employer_id'])
+    extract['job_mobility_edges'] = pd.DataFrame({'person_or_awards_involved_id': after.loc[moved, 'person_id'],
+                                                  'from_org_id': prev_org[moved].astype(int),
+                                                  'to_org_id': after.loc[moved, 'employer_id']})
+
+    before = jobs.assign(start=starts)[(starts <= jobs['person_id'].map(first_years)).to_numpy()]
+    pinpointed = before.sort_values('start', kind='mergesort').drop_duplicates('person_id', keep='last')
+    dems = tables['individual_demographics'][['person_id', 'race_ethnicity_urm', 'gender']]
+    dems = dems.rename(columns={'race_ethnicity_urm': 'race_ethnicity_URM'})
+    extract['pinpointed_jobs'] = (tables['individual_awards'][['person_id', 'award_id']]
+                                  .merge(pinpointed[['person_id', 'job_category']], on='person_id', how='left')
+                                  .merge(dems, on='person_id', how='left'))
+    return extract
+
+
+# The file of each table in the generated folder (see the header)
+LOG_TASK_FILES = {'awards': 'Input/awards_02.csv', 'individual_awards': 'Input/individual_awards.csv',
+                  'individual_demographics': 'Input/individual_demographics_02.csv',
+                  'individual_jobs': 'Input/individual_jobs_02.csv', 'organizations': 'Input/organizations.csv'}
+FIGURE_FILES = {'awards': 'data_master/awards.csv', 'individual_awards': 'data_master/individual_awards.csv',
+                'individual_demographics': 'data_master/individual_demographics.csv',
+                'individual_jobs': 'data_master/individual_jobs.csv',
+                'organizations': 'data_master/organizations.csv',
+                'job_mobility_edges': 'org_network/output/01_02_01_job_mobility_edges_after_advance.csv',
+                'pinpointed_jobs': 'small visualizations/output/'
+                                   'eda_01_03_01_individual_awards_with_pinpointed_job_and_demographic.csv'}
+
+
+# Write the given tables to the given folder, with the given file of each table
+def write_tables(folder, tables, files):
+    for table, name in files.items():
+        path = os.path.join(folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tables[table].to_csv(path, index=False)
+
+
+# Generate a dataset at the given scale, and write it to the given folder (see the header for its layout)
+# Return: the folder
+def write_dataset(folder, scale=1, seed=0):
+    tables = generate(scale, seed)
+    write_tables(folder, tables, LOG_TASK_FILES)
+    write_tables(folder, figure_extract(tables), FIGURE_FILES)
+    for name in ('small visualizations/src', 'small visualizations/figures'):
+        os.makedirs(os.path.join(folder, name), exist_ok=True)
+    return folder
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic ADVANCE dataset.')
+    parser.add_argument('scale', type=float, help='the number of people, as a multiple of the current extract\'s')
+    parser.add_argument('--seed', type=int, default=0, help='the random seed')
+    parser.add_argument('--out', default=None, help='the output folder (default: data/<SCALE>x)')
+    args = parser.parse_args()
+
+    folder = args.out or os.path.join(HERE, 'data', '{:g}x'.format(args.scale))
+    write_dataset(folder, args.scale, args.seed)
+    print('Wrote a ' + '{:g}x'.format(args.scale) + ' dataset to ' + folder)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# PURPOSE: Time the hot paths of the log task and the figure builds on synthetic datasets of increasing size.
+# INPUT: The synthetic datasets of the given scales (see generate.py), which are generated on first use.
+# OUTPUT: A table of the wall time and peak memory of each benchmark case at each scale (printed), and the same results
+# as JSON (results/<date>_<time>.json), so that two runs can be compared (--compare).
+# Each case is set up outside of the timing (ex. the copy of a table which the case modifies), run --repeat times for
+# the best wall time, and run once more under tracemalloc for the peak memory of the Python allocations (pandas and
+# NumPy buffers included), since tracing slows the run down. A failing case is recorded with its error, and the rest
+# of the suite still runs.
+# USAGE: python run.py [--scales 1 10 100] [--repeat 3] [--cases CASE ...] [--compare RESULTS.json]
+# (the 1000x dataset takes several GB of disk and memory, so it is only run when asked for with --scales)
+
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, '..')
+
+# Shared ADVANCE processing code, located in the repository root
+sys.path.append(ROOT)
+from advance.categories import JOBS
+from advance.cleaning import clean_jobs, trim_spaces
+from advance.dates import early_title_jobs
+from advance.figures import FigureData
+from advance.orgs import OrgClassifier, mark_non_uni_jobs
+from advance.positions import locate, first_award_orgs
+from advance.schema import read_table, parse_years
+from advance.terms import term_frequencies, find_category_misfits
+from advance.tiers import person_first_job_tiers, person_highest_job_tiers, person_last_job_tiers
+
+from generate import LOG_TASK_FILES, write_dataset
+
+LOG_TASK = os.path.join(ROOT, 'master data analysis project', 'src', 'log_task.py')
+FIGURES = os.path.join(ROOT, 'small visualizations', 'src')
+
+SCALES = [1, 10, 100]
+
+
+# Load the given script as a module (without running its __main__ block)
+def load_script(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Dataset:
+    # The tables of a generated dataset, loaded and processed once for the cases which start from a later stage
+    def __init__(self, folder):
+        self.folder = folder
+        self.tables = {table: read_table(table, os.path.join(folder, name)) for table, name in LOG_TASK_FILES.items()}
+        self.awards = self.tables['individual_awards'].drop_duplicates(['person_id', 'award_id'])
+        self.orgs = self.tables['organizations'].copy()
+        self.orgs['is_uni'] = OrgClassifier().classify(self.orgs)
+        self.jobs = clean_jobs(self.tables['individual_jobs'])[0]
+        mark_non_uni_jobs(self.jobs, self.orgs)
+        self.cats = sorted([cat for cat in self.jobs['job_category'].dropna().unique() if cat != 'non-uni'],
+                           key=JOBS.key)
+        first_awards = first_award_orgs(self.awards)
+        self.first_keys = first_awards[['person_id', 'first_year', 'first_org']]
+
+
+# BENCHMARK CASES ------------------------------------------------------------------------------
+# Each case takes the dataset and returns a pair of functions: the setup (whose result is passed to the run, and which
+# is not timed) and the run
+
+def case_read_tables(data):
+    return (lambda: None,
+            lambda _: [read_table(table, os.path.join(data.folder, name)) for table, name in LOG_TASK_FILES.items()])
+
+
+def case_parse_years(data):
+    path = os.path.join(data.folder, LOG_TASK_FILES['individual_jobs'])
+    cells = pd.read_csv(path, usecols=['job_start_year'], dtype=str)['job_start_year']
+    return lambda: None, lambda _: parse_years(cells)
+
+
+def case_trim_spaces(data):
+    return lambda: data.tables['individual_jobs'].copy(), lambda jobs: trim_spaces(jobs, ['bio_urls'])
+
+
+def case_clean_jobs(data):
+    return lambda: data.tables['individual_jobs'], clean_jobs
+
+
+def case_classify_orgs(data):
+    return lambda: OrgClassifier(), lambda classifier: classifier.classify(data.tables['organizations'])
+
+
+def case_mark_non_uni_jobs(data):
+    return lambda: data.jobs.copy(), lambda jobs: mark_non_uni_jobs(jobs, data.orgs)
+
+
+def case_term_frequencies(data):
+    return (lambda: None,
+            lambda _: term_frequencies(data.jobs, 'job_category', 'job_title').top_all(15, data.cats))
+
+
+def case_category_misfits(data):
+    freqs = term_frequencies(data.jobs, 'job_category', 'job_title').top_all(15, data.cats)
+    keys = {cat: [term for term, count in freqs[cat]] for cat in data.cats}
+    return lambda: None, lambda _: find_category_misfits(data.jobs, keys, {cat: [] for cat in data.cats}, data.cats)
+
+
+def case_early_title_jobs(data):
+    return lambda: None, lambda _: early_title_jobs(data.jobs, data.awards)
+
+
+def case_first_award_orgs(data):
+    return lambda: None, lambda _: first_award_orgs(data.awards)
+
+
+# The person-level position cases (the first, highest, and last job of every person)
+def locate_case(tiers):
+    def case(data):
+        return lambda: None, lambda _: locate(data.jobs, data.first_keys, tiers, JOBS.ranks)
+    return case
+
+
+# The role-level positions, through the log task's stage (which also collapses the award roles and looks up the award
+# end years)
+def case_role_positions(data):
+    log_task = load_script(LOG_TASK, 'log_task')
+    jobs = {'jobs': data.jobs}
+    persons = {'first_awards': first_award_orgs(data.awards)}
+    return lambda: None, lambda _: log_task.role_positions(jobs, data.tables['individual_awards'],
+                                                           data.tables['awards'], persons)
+
+
+# The figure cases: a figure script's render, from a fresh FigureData (so that the time includes its table loads and
+# filters), run from the dataset's copy of the script folder since the scripts read the processed CSVs relative to it
+def figure_case(script):
+    def case(data):
+        module = load_script(os.path.join(FIGURES, script + '.py'), 'figure_' + script[:2])
+        src = os.path.join(data.folder, 'small visualizations', 'src')
+        outp = os.path.join(data.folder, 'small visualizations', 'figures') + os.sep
+
+        def run(_):
+            cwd = os.getcwd()
+            os.chdir(src)
+            try:
+                module.render(FigureData(os.path.join(data.folder, 'data_master') + os.sep), outp)
+            finally:
+                plt.close('all')
+                os.chdir(cwd)
+        return lambda: None, run
+    return case
+
+
+CASES = {'read_tables': case_read_tables,
+         'parse_years': case_parse_years,
+         'trim_spaces': case_trim_spaces,
+         'clean_jobs': case_clean_jobs,
+         'classify_orgs': case_classify_orgs,
+         'mark_non_uni_jobs': case_mark_non_uni_jobs,
+         'term_frequencies': case_term_frequencies,
+         'category_misfits': case_category_misfits,
+         'early_title_jobs': case_early_title_jobs,
+         'first_award_orgs': case_first_award_orgs,
+         'first_job': locate_case(person_first_job_tiers),
+         'highest_job': locate_case(person_highest_job_tiers),
+         'last_job': locate_case(person_last_job_tiers),
+         'role_positions': case_role_positions,
+         'fig_03': figure_case('03_pi_race_cohort_bar_person'),
+         'fig_16': figure_case('16_pi_changing_institutions_pie_person'),
+         'fig_17': figure_case('17_pi_changing_institutions_gender_bar_person'),
+         'fig_20': figure_case('20_pi_moved_it_site_gender_bar_person'),
+         'fig_24': figure_case('24_other_gender_external_cohort_bar_person'),
+         'fig_29': figure_case('29_other_race_internal_cohort_bar_person')}
+
+
+# Time the given case: the best wall time of the given number of runs, and the peak traced memory of one more run
+# Return: a dict of the best and mean seconds, and the peak memory in MB
+def measure(setup, run, repeat):
+    times = []
+    for _ in range(repeat):
+        arg = setup()
+        gc.collect()
+        start = time.perf_counter()
+        run(arg)
+        times.append(time.perf_counter() - start)
+
+    arg = setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run(arg)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(times), 'mean_seconds': sum(times) / len(times), 'peak_mb': peak / 2**20}
+
+
+# Run the given cases on the dataset of the given scale (generating it first if needed)
+# Return: a list of result dicts, one per case
+def run_scale(scale, names, repeat, data_dir):
+    folder = os.path.join(data_dir, '{:g}x'.format(scale))
+    if not os.path.exists(os.path.join(folder, 'Input')):
+        print('Generating the ' + '{:g}x'.format(scale) + ' dataset...')
+        write_dataset(folder, scale)
+    data = Dataset(folder)
+
+    results = []
+    for name in names:
+        result = {'scale': scale, 'people': len(data.tables['individual_demographics']), 'case': name}
+        try:
+            result.update(measure(*CASES[name](data), repeat))
+        except Exception as e: # ex. the NLTK stop words are not downloaded
+            result['error'] = type(e).__name__ + ': ' + str(e).strip().splitlines()[0]
+        results.append(result)
+        print(format_result(result))
+    return results
+
+
+def format_result(result, previous=None):
+    line = '{:>6}  {:<20}'.format('{:g}x'.format(result['scale']), result['case'])
+    if 'error' in result:
+        return line + 'failed: ' + result['error']
+    line += '{:>10.4f} s {:>10.1f} MB'.format(result['seconds'], result['peak_mb'])
+    if previous is not None and 'seconds' in previous:
+        line += '  ({:.2f}x time, {:.2f}x memory)'.format(result['seconds'] / max(previous['seconds'], 1e-9),
+                                                          result['peak_mb'] / max(previous['peak_mb'], 1e-9))
+    return line
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the ADVANCE processing code on synthetic data.')
+    parser.add_argument('--scales', type=float, nargs='+', default=SCALES,
+                        help='the dataset scales (default: 1 10 100)')
+    parser.add_argument('--repeat', type=int, default=3, help='the timed runs per case (default: 3)')
+    parser.add_argument('--cases', nargs='+', default=list(CASES), choices=list(CASES), help='the cases to run')
+    parser.add_argument('--data', default=os.path.join(HERE, 'data'), help='the folder of the generated datasets')
+    parser.add_argument('--compare', default=None, help='a previous results JSON to compare against')
+    args = parser.parse_args()
+
+    results = []
+    for scale in args.scales:
+        results += run_scale(scale, args.cases, args.repeat, args.data)
+
+    os.makedirs(os.path.join(HERE, 'results'), exist_ok=True)
+    path = os.path.join(HERE, 'results', datetime.now().strftime('%Y%m%d_%H%M%S') + '.json')
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=1)
+    print('\nWrote the results to ' + path)
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = {(r['scale'], r['case']): r for r in json.load(f)}
+        print('\nCompared with ' + args.compare + ':')
+        for result in results:
+            print(format_result(result, previous.get((result['scale'], result['case']))))
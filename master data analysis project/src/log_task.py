@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# PURPOSE: Run the log task of log_master_src.ipynb as a dependency graph of named, cached stages.
+# INPUT: The awards, individual awards, individual demographics, individual jobs, and organizations CSVs (Input/).
+# OUTPUT: The log task report (Output/log_task_report.txt), and the person- and role-level logs of first, highest, and
+# last jobs (Output/log_individual_jobs.csv, Output/log_individual_awards.csv).
+# Each stage's output is cached (in Output/__pipeline_cache__), keyed by a hash of its code, its parameters, and its
+# inputs (see advance/pipeline.py), so a rerun executes only the stages whose inputs changed: ex. editing KEYS_DICT
+# reruns the category-fit check and the report, but not the position location stages.
+# With --incremental, only the two logs are refreshed: the positions of the people whose input rows changed since the
+# previous refresh are located again, and the logs and their position counts (Output/log_position_counts.csv) are
+# patched (see advance/incremental.py).
+# With --profile, the time and memory of each executed stage and hot helper are measured (see advance/profiling.py),
+# added to the report as a Performance section, and saved to Output/log_task_performance.json.
+# USAGE: python log_task.py [--incremental] [--profile] [STAGE ...] (all stages by default), from this folder
+
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+# Shared ADVANCE processing code, located in the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import advance.categories
+import advance.cleaning
+import advance.dates
+import advance.incremental
+import advance.log_report
+import advance.orgs
+import advance.positions
+import advance.report
+import advance.schema
+import advance.terms
+import advance.tiers
+from advance.categories import JOBS, ROLES
+from advance.cleaning import clean_jobs, trim_spaces, MAX_YEAR
+from advance.dates import early_title_jobs
+from advance.incremental import IncrementalLogs
+from advance.log_report import (header, out_rundown, out_category_counts, out_missing_data, out_cleaning,
+                                out_universities, out_early_titles, out_misfits, out_person_positions,
+                                out_role_positions)
+from advance.orgs import KEYWORDS_CSV, OrgClassifier, mark_non_uni_jobs, read_org_keywords
+from advance.pipeline import File, Pipeline, content_hash
+from advance.positions import locate, first_award_orgs
+from advance.profiling import PROFILER
+from advance.report import ReportWriter, ECHO_NONE
+from advance.schema import read_table
+from advance.terms import term_frequencies, find_category_misfits
+from advance.tiers import (person_first_job_tiers, person_highest_job_tiers, person_last_job_tiers,
+                           role_first_job_tiers, role_highest_job_tiers, role_last_job_tiers)
+
+# INPUT/OUTPUT PATHS ---------------------------------------------------------------------------
+inp_ipynb = 'Input/'
+out_ipynb = 'Output/'
+
+# The input CSV of each master table
+INPUTS = {'awards': 'awards_02.csv',
+          'individual_awards': 'individual_awards.csv',
+          'individual_demographics': 'individual_demographics_02.csv',
+          'individual_jobs': 'individual_jobs_02.csv',
+          'organizations': 'organizations.csv'}
+
+# PARAMETERS -----------------------------------------------------------------------------------
+N = 120 # report width
+
+# The number of most frequent terms of each job category which count as fitting the category
+FIT_TERMS = 15
+
+# The manually defined terms which fit (keys) or do not fit (antikeys) each job category, besides its most frequent
+# terms
+KEYS_DICT = {'admin_leadership': ['chief', 'ceo'],
+             'director_managerial': [],
+             'chair_dept': ['chairman'],
+             'director_chair': [],
+             'director_research': [],
+             'director_diversity': [],
+             'faculty': ['lecturer', 'scientist', 'instructor'],
+             'staff_management': ['research', 'researcher', 'advisor'],
+             'staff_research': [],
+             'adjunct': [],
+             'postdoc': ['postdoc'],
+             'deceased': []}
+
+ANTIKEYS_DICT = {'admin_leadership': ['advisor', 'liaison'],
+                 'director_managerial': ['advisor', 'liaison'],
+                 'chair_dept': [],
+                 'director_chair': [],
+                 'director_research': [],
+                 'director_diversity': [],
+                 'faculty': [],
+                 'staff_management': [],
+                 'staff_research': [],
+                 'adjunct': [],
+                 'postdoc': [],
+                 'deceased': []}
+
+
+# STAGES ---------------------------------------------------------------------------------------
+
+# Load the given master table with its declared column types
+def load(path, table):
+    return read_table(table, path.path)
+
+
+# Get the job and award role categories of the loaded tables, from highest to lowest
+def categories(load_individual_jobs, load_individual_awards):
+    roles = load_individual_awards.drop_duplicates(['person_id', 'award_id'])
+    job_cats = sorted(load_individual_jobs['job_category'].dropna().unique(), key=JOBS.key)
+    role_cats = sorted(roles['award_role_cat'].dropna().unique(), key=ROLES.key)
+    return {'job_cats': job_cats, 'role_cats': role_cats}
+
+
+# Trim the spaces of the string columns of a copy of the given table, excluding the given columns
+# Return: a dict of the trimmed table, and the number of trimmed cells per column
+def trim(table, exclude=()):
+    changed = trim_spaces(table, list(exclude))
+    return {'table': table, 'changed': changed}
+
+
+def trim_jobs(load_individual_jobs):
+    return trim(load_individual_jobs.copy(), ['bio_urls'])
+
+
+# The individual awards are trimmed after the duplicate individuals within the same grant are dropped
+def trim_awards(load_individual_awards):
+    return trim(load_individual_awards.drop_duplicates(['person_id', 'award_id']))
+
+
+def trim_orgs(load_organizations):
+    return trim(load_organizations.copy())
+
+
+# Drop the student and no-category positions, and fill in the missing years
+def clean(trim_individual_jobs):
+    jobs, report = clean_jobs(trim_individual_jobs['table'])
+    return {'jobs': jobs, 'report': report}
+
+
+# Label the organizations as universities or non-universities, by the given keyword table
+def classify_orgs(trim_organizations, keywords):
+    orgs = trim_organizations['table'].copy()
+    orgs['is_uni'] = OrgClassifier(read_org_keywords(keywords.path)).classify(orgs)
+    return orgs
+
+
+# Relabel the positions at non-university employers as non-uni
+def mark_non_unis(clean, classify_orgs):
+    jobs = clean['jobs'].copy()
+    body_uni, changed_rows = mark_non_uni_jobs(jobs, classify_orgs)
+    return {'jobs': jobs, 'body': body_uni, 'changed_rows': changed_rows}
+
+
+# Get the most frequent job title terms of each job category (except non-uni)
+def frequent_terms(mark_non_unis, categories, k):
+    cats = [cat for cat in categories['job_cats'] if cat != 'non-uni']
+    return term_frequencies(mark_non_unis['jobs'], 'job_category', 'job_title').top_all(k, cats)
+
+
+# Find the ADVANCE director titles which start before the person entered the network
+def date_check(mark_non_unis, trim_individual_awards):
+    return early_title_jobs(mark_non_unis['jobs'], trim_individual_awards['table'])
+
+
+# Find the job titles which contain neither the most frequent terms of their category nor any of its keys
+def category_fit(mark_non_unis, categories, frequent_terms, keys_dict, antikeys_dict):
+    cats = [cat for cat in categories['job_cats'] if cat != 'non-uni']
+    keys = {cat: [tup[0] for tup in frequent_terms[cat]] + keys_dict[cat] for cat in cats}
+    return find_category_misfits(mark_non_unis['jobs'], keys, antikeys_dict, cats)
+
+
+# Locate the first, highest, and last jobs of each person
+# Return: a dict of the person-level log, and the first awards of each person (with the number of ties)
+def person_positions(mark_non_unis, trim_individual_awards, load_individual_demographics):
+    jobs = mark_non_unis['jobs']
+    first_awards = first_award_orgs(trim_individual_awards['table'])
+    ties = int((first_awards['first_orgs'] > 1).sum())
+
+    log = load_individual_demographics[['person_id', 'name']].copy()
+    first_keys = log[['person_id']].join(first_awards.set_index('person_id'), on='person_id')
+    log['first_year_in_advance'] = first_keys['first_year']
+    log['first_job'] = locate(jobs, first_keys, person_first_job_tiers, JOBS.ranks)['job_category']
+    log['highest_job'] = locate(jobs, first_keys, person_highest_job_tiers, JOBS.ranks)['job_category']
+    log['last_job'] = locate(jobs, first_keys, person_last_job_tiers, JOBS.ranks)['job_category']
+    return {'log': log, 'first_awards': first_awards, 'ties': ties}
+
+
+# Locate the first, highest, and last jobs of each award role, with each (person, award) collapsed to their highest
+# award role category
+def role_positions(mark_non_unis, load_individual_awards, load_awards, person_positions):
+    jobs = mark_non_unis['jobs']
+    log = load_individual_awards[['person_id', 'name', 'award_id', 'award_start_year', 'award_org_name',
+                                  'award_org_id', 'award_role_cat', 'award_role']].copy()
+
+    award_key = ['person_id', 'award_id']
+    highest_roles = (log.assign(role_rank=ROLES.rank(log['award_role_cat']))
+                     .sort_values(award_key + ['role_rank'], kind='mergesort')
+                     .drop_duplicates(award_key).set_index(award_key))
+    log = log.drop_duplicates(award_key)
+    role_index = pd.MultiIndex.from_frame(log[award_key])
+    log['award_role_cat'] = highest_roles['award_role_cat'].reindex(role_index).to_numpy()
+    log['award_role'] = highest_roles['award_role'].reindex(role_index).to_numpy()
+
+    # Look up the end year of each award by its start year and institution (3000 if the award is not in the awards file)
+    award_ends = (load_awards.drop_duplicates(['award_start_year', 'awarded_org_id'])
+                  .set_index(['award_start_year', 'awarded_org_id'])['award_end_year'])
+    award_windows = pd.MultiIndex.from_frame(log[['award_start_year', 'award_org_id']])
+    award_end_year = award_ends.reindex(award_windows).where(award_windows.isin(award_ends.index), MAX_YEAR)
+    log.insert(4, 'award_end_year', award_end_year.array)
+
+    role_keys = log[['person_id', 'award_org_id', 'award_start_year', 'award_end_year']].join(
+        person_positions['first_awards'].set_index('person_id')['first_year'], on='person_id')
+    log['first_job'] = locate(jobs, role_keys, role_first_job_tiers, JOBS.ranks)['job_category']
+    log['highest_job'] = locate(jobs, role_keys, role_highest_job_tiers, JOBS.ranks)['job_category']
+    log['last_job'] = locate(jobs, role_keys, role_last_job_tiers, JOBS.ranks)['job_category']
+    return log
+
+
+# REPORT ---------------------------------------------------------------------------------------
+
+# Write the report body (sections 1-7 of the notebook, see advance/log_report.py; the header with the generation time is
+# added when it is saved)
+def report(load_awards, load_individual_awards, load_individual_demographics, load_individual_jobs,
+           load_organizations, categories, trim_individual_awards, clean, classify_orgs, mark_non_unis, date_check,
+           category_fit, person_positions, role_positions):
+    report = ReportWriter(None, width=N, echo=ECHO_NONE)
+    job_cats, role_cats = categories['job_cats'], categories['role_cats']
+    ind_jobs = load_individual_jobs
+    ind_awards = trim_individual_awards['table']
+    jobs = mark_non_unis['jobs']
+
+    out_rundown(report, load_organizations, load_awards, load_individual_demographics, load_individual_awards,
+                ind_awards, ind_jobs, job_cats, role_cats)
+    out_category_counts(report, ind_jobs, 'job_category', job_cats, 'individual jobs', 'positions')
+    out_category_counts(report, load_individual_awards.drop_duplicates(['person_id', 'award_id']), 'award_role_cat',
+                        role_cats, 'individual awards', 'roles')
+    out_missing_data(report, ind_jobs)
+    out_cleaning(report, clean['report'])
+    out_universities(report, classify_orgs)
+    out_early_titles(report, date_check)
+    out_misfits(report, category_fit, [cat for cat in job_cats if cat != 'non-uni'], FIT_TERMS)
+    out_person_positions(report, person_positions['log'], jobs, ind_awards, job_cats, role_cats)
+    out_role_positions(report, role_positions, jobs, ind_awards, job_cats, role_cats)
+    return report.read()
+
+
+# GRAPH ----------------------------------------------------------------------------------------
+
+# Build the stage graph of the log task, caching the stage outputs in the given folder
+def build_pipeline(cache_dir, log=print):
+    pipeline = Pipeline(cache_dir, log)
+    for table, name in INPUTS.items():
+        pipeline.add('load_' + table, load, params={'path': File(inp_ipynb + name), 'table': table},
+                     code=[advance.schema])
+    pipeline.add('categories', categories, ['load_individual_jobs', 'load_individual_awards'],
+                 code=[advance.categories])
+
+    pipeline.add('trim_individual_jobs', trim_jobs, ['load_individual_jobs'], code=[trim, advance.cleaning])
+    pipeline.add('trim_individual_awards', trim_awards, ['load_individual_awards'], code=[trim, advance.cleaning])
+    pipeline.add('trim_organizations', trim_orgs, ['load_organizations'], code=[trim, advance.cleaning])
+
+    pipeline.add('clean', clean, ['trim_individual_jobs'], code=[advance.cleaning])
+    pipeline.add('classify_orgs', classify_orgs, ['trim_organizations'], params={'keywords': File(KEYWORDS_CSV)},
+                 code=[advance.orgs])
+    pipeline.add('mark_non_unis', mark_non_unis, ['clean', 'classify_orgs'], code=[advance.orgs])
+    pipeline.add('frequent_terms', frequent_terms, ['mark_non_unis', 'categories'], params={'k': FIT_TERMS},
+                 code=[advance.terms])
+    pipeline.add('date_check', date_check, ['mark_non_unis', 'trim_individual_awards'], code=[advance.dates])
+    pipeline.add('category_fit', category_fit, ['mark_non_unis', 'categories', 'frequent_terms'],
+                 params={'keys_dict': KEYS_DICT, 'antikeys_dict': ANTIKEYS_DICT}, code=[advance.terms])
+    pipeline.add('person_positions', person_positions,
+                 ['mark_non_unis', 'trim_individual_awards', 'load_individual_demographics'],
+                 code=[advance.positions, advance.tiers])
+    pipeline.add('role_positions', role_positions,
+                 ['mark_non_unis', 'load_individual_awards', 'load_awards', 'person_positions'],
+                 code=[advance.positions, advance.tiers, advance.categories])
+    pipeline.add('report', report,
+                 ['load_awards', 'load_individual_awards', 'load_individual_demographics', 'load_individual_jobs',
+                  'load_organizations', 'categories', 'trim_individual_awards', 'clean', 'classify_orgs',
+                  'mark_non_unis', 'date_check', 'category_fit', 'person_positions', 'role_positions'],
+                 code=[advance.report, advance.log_report])
+    return pipeline
+
+
+# INCREMENTAL REFRESH --------------------------------------------------------------------------
+
+# Locate the positions of the given input tables (table -> df) through the log task stages, without the stage cache
+# Return: the person- and role-level logs
+def locate_positions(tables):
+    orgs = classify_orgs(trim_orgs(tables['organizations']), File(KEYWORDS_CSV))
+    jobs = mark_non_unis(clean(trim_jobs(tables['individual_jobs'])), orgs)
+    persons = person_positions(jobs, trim_awards(tables['individual_awards']), tables['individual_demographics'])
+    roles = role_positions(jobs, tables['individual_awards'], tables['awards'], persons)
+    return persons['log'], roles
+
+
+# The code and configuration the logs depend on; a snapshot of any other version is rebuilt in full
+def positions_version():
+    return content_hash([locate_positions, trim, trim_jobs, trim_awards, trim_orgs, clean, classify_orgs,
+                         mark_non_unis, person_positions, role_positions, advance.categories, advance.cleaning,
+                         advance.incremental, advance.orgs, advance.positions, advance.schema, advance.tiers,
+                         File(KEYWORDS_CSV)])
+
+
+# Refresh the logs for the people whose input rows changed since the previous refresh, and save them
+def refresh_logs():
+    tables = {table: read_table(table, inp_ipynb + name) for table, name in INPUTS.items()}
+    logs = IncrementalLogs(out_ipynb + '__pipeline_cache__/positions_snapshot.pkl', locate_positions,
+                           positions_version())
+    person_log, role_log, counts = logs.refresh(tables)
+
+    person_log.to_csv(out_ipynb + 'log_individual_jobs.csv', index=False)
+    role_log.to_csv(out_ipynb + 'log_individual_awards.csv', index=False)
+    pd.concat(counts, names=['level', 'job_category']).to_csv(out_ipynb + 'log_position_counts.csv')
+    print('Located the positions of ' + ('every person' if logs.people is None
+                                         else str(len(logs.people)) + ' changed people') + '.')
+
+
+# Save the outputs of the given pipeline run: the report (with a header of the generation time) and the logs
+def save_outputs(results):
+    if 'report' in results:
+        with ReportWriter(out_ipynb + 'log_task_report.txt', width=N, echo=ECHO_NONE) as writer:
+            writer.clear(header())
+        with open(out_ipynb + 'log_task_report.txt', 'a') as f:
+            f.write(results['report'])
+    if 'person_positions' in results:
+        results['person_positions']['log'].to_csv(out_ipynb + 'log_individual_jobs.csv', index=False)
+    if 'role_positions' in results:
+        results['role_positions'].to_csv(out_ipynb + 'log_individual_awards.csv', index=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the log task.')
+    parser.add_argument('stages', nargs='*', help='the stages to run (default: all of them)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='refresh only the logs, for the people whose input rows changed')
+    parser.add_argument('--profile', action='store_true', help='measure the time and memory of the stages and helpers')
+    args = parser.parse_args()
+
+    if args.profile:
+        PROFILER.enable()
+    if args.incremental:
+        refresh_logs()
+    else:
+        pipeline = build_pipeline(out_ipynb + '__pipeline_cache__')
+        results = pipeline.run(args.stages or None)
+        save_outputs(results)
+        print('Ran ' + str(len(pipeline.executed)) + ' stages (' + ', '.join(pipeline.executed) + '); '
+              + str(len(pipeline.cached)) + ' stages were cached.')
+
+        # The Performance section follows the report body; cached stages did not run, so they are not measured
+        if args.profile and 'report' in results:
+            with ReportWriter(out_ipynb + 'log_task_report.txt', width=N, echo=ECHO_NONE) as writer:
+                PROFILER.write_section(writer, 8)
+    if args.profile:
+        PROFILER.disable()
+        PROFILER.write_json(out_ipynb + 'log_task_performance.json')
@@ -4,135 +4,90 @@
 # In[ ]:
 
 
-# Get the year and job of the given person when they first entered the ADVANCE network (via the first grant they worked on)
-# Input: an individual's id, the year of the person's first grant they worked on, and the institution of their first grant
-# Return the first job and first year in the network of the given person
-def get_first_job(p_id, year, e_id):
-    # Get the jobs for this p_id at the given e_id where all job years are leq the award start year
-    jobs_slice = ind_jobs.loc[(ind_jobs['person_id'] == p_id)
-                              & (ind_jobs['job_start_year'] - year <= 0)
-                              & (ind_jobs['job_end_year'] - year >= 0)
-                              & (ind_jobs['employer_id'] == e_id)].sort_values(by = 'job_start_year') 
-    ind = -1
-    # We're getting the job they had when they entered the network (start of grant)
-    # So we want the closest job they had to the start year of the grant
-    
-    # If there are no jobs found which started on or before the grant start year, get the first job at the institution    
-    if len(jobs_slice) == 0:                
-        jobs_slice = ind_jobs.loc[(ind_jobs['person_id'] == p_id)
-                                  & (ind_jobs['employer_id'] == e_id)].sort_values(by = 'job_start_year')
-        ind = 0 # First job
-       
-        # If there are no jobs at the first award institution, find the closest (<=) job to the first award's start year
-        if len(jobs_slice) == 0:
-            jobs_slice = ind_jobs.loc[(ind_jobs['person_id'] == p_id)
-                                      & (ind_jobs['job_start_year'] - year <= 0)
-                                      & (ind_jobs['job_end_year'] - year >= 0)].sort_values(by = 'job_start_year') 
-            ind = -1 # Last row has closest job 
-                    # If still no jobs, return NaN
-    
-            # If there are no jobs <= the award start year, just get the highest job for this person
-            if len(jobs_slice) == 0:
-                jobs_slice = get_jobs(p_id)
-                                
-                # If there are still no jobs, return NaN
-                if (len(jobs_slice) == 0):
-                    return (np.nan, np.nan)
-                
-                else: # This person has at least one job; get the highest one
-                    jobs_list = jobs_slice['job_category'].drop_duplicates().to_list()
-                    jobs_list = [x for x in jobs_list if str(x) != 'nan']
-                    highest_title = get_highest_title(jobs_list)
-                    # We assume that they entered the ADVANCE network in the grant start year
-                    return (highest_title, year)
-       
-    # Ascending order --> take either the jobs in the first year or the last one (if need leq closest to award year)
-    first_year_in_ADVANCE = jobs_slice['job_start_year'][jobs_slice.index[ind]]
+from advance.cleaning import MAX_YEAR
+from advance.positions import locate, first_award_orgs, at_award_orgs, FIRST, LAST, LATEST, ANY
+from advance.tiers import held_in_first_year, at_first_org, held_during_award
 
-    # Get all rows in the dataframe slice that contain the first year
-    jobs_first_year_slice = jobs_slice.loc[ind_jobs['job_start_year'] == first_year_in_ADVANCE]
+# The tiers used to find the job a person had when they entered the network, in order of preference:
+# - The closest job they had to the start year of the grant (at the first award institution, held in that year)
+# - If there are none, the first job at the first award institution
+# - If there are no jobs at the first award institution, the closest (<=) job to the first award's start year
+# - If there are no jobs <= the award start year, the highest job this person ever had
+# Within a tier, ties in the picked start year are broken using the job hierarchy.
+first_job_tiers = [(lambda jobs: at_first_org(jobs) & held_in_first_year(jobs), LAST),
+                   (at_first_org, FIRST),
+                   (held_in_first_year, LAST),
+                   (None, ANY)]
 
-    # Find the highest position of all the first-year jobs
-    jobs_list = jobs_first_year_slice['job_category'].drop_duplicates().to_list()
-    jobs_list = [x for x in jobs_list if str(x) != 'nan']
-    highest_title = get_highest_title(jobs_list)
-    return (highest_title, first_year_in_ADVANCE)
+# Get the year and job of every person when they first entered the ADVANCE network (via the first grant they worked on)
+# Input: a df with a person_id column, and a df of (person_id, first_year, first_org) rows from first_award_orgs
+# Return: a df aligned with the given df with the first_job and first_year_in_advance of each person (NaN if they have
+# no jobs); for the last tier, we assume that they entered the ADVANCE network in the grant start year
+def get_first_jobs(people, first_awards):
+    keys = people[['person_id']].join(first_awards.set_index('person_id'), on='person_id')
+    found = locate(ind_jobs, keys, first_job_tiers, job_dict)
+    first_year = found['job_start_year'].where(found['tier'] != len(first_job_tiers) - 1, keys['first_year'])
+    return pd.DataFrame({'first_job': found['job_category'], 'first_year_in_advance': first_year})
 
-# Get the job of the given person after they entered the ADVANCE network (via the first grant they worked on)
-# Input: an individual's id, the year of the person's first grant they worked on, and (optionally) an employer id to filter by
-def get_highest_job(p_id, e_id=True):
-  
-    first_year_in_advance = log_individual_jobs.loc[log_individual_jobs['person_id'] == p_id, 
-                                                    'first_year_in_advance'].iloc[0]
-    
-    # First, get the jobs they had at their award institutions after entering the ADVANCE network
-    if e_id: # If e_id=True then no filtering by employer id
-        inst = get_awards(p_id)['award_org_id'].unique()
-        jobs = ind_jobs[(ind_jobs['person_id'] == p_id) 
-                        & (ind_jobs['job_start_year'] >= first_year_in_advance)
-                        & (ind_jobs['employer_id'].isin(inst))]
-    else:
-        jobs = ind_jobs[(ind_jobs['person_id'] == p_id) & (ind_jobs['employer_id'] == e_id)]
-    
-    # If there are none, then just get the jobs they had after they entered the ADVANCE network 
-    if len(jobs) == 0:
-        jobs = ind_jobs[(ind_jobs['person_id'] == p_id) & (ind_jobs['job_start_year'] >= first_year_in_advance)]
-        
-        # If they have no jobs after entering the network, then just get the highest job that this person ever had
-        if len(jobs) == 0:
-            jobs = ind_jobs[ind_jobs['person_id'] == p_id]
-            
-            # If still no jobs, return NaN
-            if len(jobs) == 0: 
-                return np.nan
-    
-    jobs_list = jobs['job_category'].drop_duplicates().to_list()
-    jobs_list = [x for x in jobs_list if str(x) != 'nan']
-    return get_highest_title(jobs_list)
+# Determine whether each candidate job started after the person entered the network
+def started_after_first_year(jobs):
+    return jobs['job_start_year'] >= jobs['first_year_in_advance']
 
-# Get the most recent job of the given individual, or the highest most recent in the case of ties
-# Input: an individual's id, and (optionally) a max year to filter by
-def get_last_job(p_id, year=3000):
-    jobs_slice = get_jobs(p_id)
-    if len(jobs_slice) == 0:
-        return np.nan
-    jobs_slice_leq = jobs_slice[jobs_slice['job_start_year'] <= year].copy()
-    if len(jobs_slice_leq) > 0:
-        jobs_slice = jobs_slice_leq
-    last_start_year = jobs_slice['job_start_year'][jobs_slice.index[-1]]
-    jobs_last_start_year = jobs_slice.loc[ind_jobs['job_start_year'] == last_start_year].sort_values('job_end_year')
-    jobs_list = jobs_last_start_year['job_category'].drop_duplicates().to_list()
-    jobs_list = [x for x in jobs_list if str(x) != 'nan']
-    return get_highest_title(jobs_list)   
+# The tiers used to find the highest job a person had after entering the network, in order of preference:
+# - The jobs they had at their award institutions after entering the ADVANCE network (or, for (person, employer) pairs,
+#   the jobs at the given employer)
+# - If there are none, the jobs they had after they entered the ADVANCE network
+# - If they have no jobs after entering the network, the highest job that this person ever had
+highest_job_tiers = [(lambda jobs: jobs['at_award_org'] & started_after_first_year(jobs), ANY),
+                     (started_after_first_year, ANY),
+                     (None, ANY)]
+pair_highest_job_tiers = [(lambda jobs: jobs['employer_id'] == jobs['org'], ANY)] + highest_job_tiers[1:]
 
-ties = 0
-doc_tie = ''
+# Get the highest job of every person after they entered the ADVANCE network (via the first grant they worked on)
+# Input: a df of (person_id, first_year_in_advance) rows, and (optionally) an 'org' column of employer ids to filter by
+# instead of the person's award institutions
+# Return: a series aligned with the given df with the highest job of each row (NaN if the person has no jobs)
+def get_highest_jobs(people):
+    keys = people[['person_id', 'first_year_in_advance'] + (['org'] if 'org' in people else [])]
+    if 'org' in keys:
+        return locate(ind_jobs, keys, pair_highest_job_tiers, job_dict)['job_category']
+    jobs = ind_jobs.assign(at_award_org=at_award_orgs(ind_jobs, ind_awards))
+    return locate(jobs, keys, highest_job_tiers, job_dict)['job_category']
+
+# The tiers used to find the most recent job of a person, in order of preference:
+# - The jobs which start in or before the max year to filter by
+# - If there are none, all of their jobs
+# The most recent start year is picked, and ties are broken using the job hierarchy.
+last_job_tiers = [(lambda jobs: jobs['job_start_year'] <= jobs['max_year'], LAST),
+                  (None, LAST)]
+
+# Role-level: the jobs at the award institution during the award, then the jobs at any institution during the award,
+# then all of their jobs. Ties in the most recent start year are broken by the most recent end year, then the hierarchy.
+role_last_job_tiers = [(lambda jobs: (jobs['employer_id'] == jobs['org']) & held_during_award(jobs), LATEST),
+                       (held_during_award, LATEST),
+                       (None, LATEST)]
 
-# Determine the most relevant positions for each category.
-for i, row in log_individual_jobs.iterrows():
-    p_id = row['person_id']
-    awards_slice = get_awards(p_id)
-    
-    # Ascending order --> first row has year and institution of the first award this person worked on
-    ind_first = awards_slice.index[0]
-    year_first = awards_slice['award_start_year'][ind_first]
-    
-    # If individuals started at two different grants in the same years, pick the one where they had the highest role
-    awards_year_first = awards_slice.loc[awards_slice['award_start_year'] == year_first].copy()
-    awards_year_first.drop_duplicates('award_org_id', inplace=True)
-    if len(awards_year_first) > 1:
-        awards_year_first['award_role_cat'] = awards_year_first['award_role_cat'].map(role_dict).argsort()
-        e_id_first = awards_year_first['award_org_id'][awards_year_first.index[-1]]
-        # doc_tie += 'Person ' + str(p_id) + '\'s highest role was at org ' + str(e_id_first) + '\n'
-        ties += 1
-    else: 
-        e_id_first = awards_slice['award_org_id'][ind_first]
-    
-    # Get the highest first position at the first institution, and the first year in the network
-    tup_first = get_first_job(p_id, int(year_first), e_id_first)
-        
-    log_individual_jobs.loc[i, 'first_year_in_advance'] = tup_first[1]
-    log_individual_jobs.loc[i, 'first_job'] = tup_first[0]
-    log_individual_jobs.loc[i, 'highest_job'] = get_highest_job(p_id, year_first)
-    log_individual_jobs.loc[i, 'last_job'] = get_last_job(p_id)
+# Get the most recent job of every individual (or role), or the highest most recent in the case of ties
+# Input: a df with a person_id column and (optionally) a max_year column to filter by; or, at the role level, a df of
+# (person_id, org, award_start_year, award_end_year) rows
+# Return: a series aligned with the given df with the last job of each row (NaN if the person has no jobs)
+def get_last_jobs(keys):
+    if 'org' in keys:
+        keys = keys[['person_id', 'org', 'award_start_year', 'award_end_year']]
+        return locate(ind_jobs, keys, role_last_job_tiers, job_dict)['job_category']
+    keys = keys[['person_id']].assign(max_year=keys['max_year'] if 'max_year' in keys else MAX_YEAR)
+    return locate(ind_jobs, keys, last_job_tiers, job_dict)['job_category']
+
+# Get the year and institution of the first award each person worked on. If individuals started at two different grants
+# in the same year, the institution listed last for that year is used, and the person is counted as a tie.
+first_awards = first_award_orgs(ind_awards)
+ties = int((first_awards['first_orgs'] > 1).sum())
+doc_tie = ''
 
+# Determine the most relevant positions for every person at once: the first position and the first year in the network,
+# then their highest and last positions
+first_jobs = get_first_jobs(log_individual_jobs, first_awards)
+log_individual_jobs['first_year_in_advance'] = first_jobs['first_year_in_advance']
+log_individual_jobs['first_job'] = first_jobs['first_job']
+log_individual_jobs['highest_job'] = get_highest_jobs(log_individual_jobs)
+log_individual_jobs['last_job'] = get_last_jobs(log_individual_jobs)
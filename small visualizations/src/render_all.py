@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# PURPOSE: Render every small visualization figure in one run.
+# INPUT: The master CSV files (loaded once per process, and shared by the figures rendered in it), and the processed
+# CSVs of the figures which use them.
+# OUTPUT: The figure PNGs of every figure script in this folder (the scripts named NN_*.py).
+# USAGE: python render_all.py [-j PROCESSES] [FIGURE ...], ex. "render_all.py 03_pi_race_cohort_bar_person" (with -j 1,
+# the figures render one after another in this process)
+
+import argparse
+import glob
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Shared ADVANCE processing code, located in the repository root
+sys.path.append(os.path.join(HERE, '..', '..'))
+from advance.render import render_figures, report_results
+
+
+# Get the module names of the figure scripts in this folder, in figure order
+def figure_modules():
+    paths = glob.glob(os.path.join(HERE, '[0-9][0-9]_*.py'))
+    return sorted(os.path.splitext(os.path.basename(path))[0] for path in paths)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render the small visualization figures.')
+    parser.add_argument('figures', nargs='*', help='the figure script names (default: all of them)')
+    parser.add_argument('-j', '--processes', type=int, default=None, help='the number of processes (default: cores)')
+    args = parser.parse_args()
+
+    # Each worker process renders its share of the figures headless (see advance/render.py)
+    names = args.figures or figure_modules()
+    results = render_figures([os.path.join(HERE, name + '.py') for name in names], args.processes)
+    sys.exit(1 if report_results(results) else 0)